@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from storage.bitmaps import CHUNK, SiteBitmaps
+from storage.records import SITE_NAMES
+
+# Boolean site queries over per-site bitmaps of 100M emails. Filling 100M
+# results through SiteBitmaps.add would take minutes, so the chunks are
+# generated directly (each site found for 1 email in 2 to 32, mx for most)
+# and the add() rate is measured separately on a sample of results.
+
+QUERIES = (
+    "GitHub & Reddit & ~Twitter",
+    "(GitHub | GitLab | Bitbucket) & ~mx",
+    "Instagram ^ Facebook",
+    "all - (GitHub | Twitter | Instagram | Facebook | Reddit | Medium | GitLab | Bitbucket)",
+)
+
+
+def random_chunk(rng, density_bits):
+    # AND of density_bits random chunks: each bit set with probability 2^-density_bits
+    bits = (1 << CHUNK) - 1
+    for _ in range(density_bits):
+        bits &= rng.getrandbits(CHUNK)
+    return bits
+
+
+def synthetic(count, rng):
+    bitmaps = SiteBitmaps(os.devnull + ".missing")
+    full, rest = divmod(count, CHUNK)
+    every = [(1 << CHUNK) - 1] * full + ([(1 << rest) - 1] if rest else [])
+    bitmaps.bitmaps["all"].chunks = every
+    for i, name in enumerate(SITE_NAMES):
+        bitmaps.bitmaps[name].chunks = [random_chunk(rng, 1 + i % 5) & chunk for chunk in every]
+    bitmaps.bitmaps["mx"].chunks = [chunk & ~random_chunk(rng, 4) for chunk in every]
+    bitmaps.count = count
+    return bitmaps
+
+
+def add_rate(sample=200_000):
+    results = [{"username": f"u{i}", "domain": "example.com", "mx": True, "gravatar": None,
+                "accounts": {name: "" for j, name in enumerate(SITE_NAMES) if (i >> j) % 3 == 0}}
+               for i in range(sample)]
+    bitmaps = SiteBitmaps(os.devnull + ".missing")
+    start = time.perf_counter()
+    for result in results:
+        bitmaps.add(result)
+    bitmaps.flush()
+    return sample / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    bitmaps = synthetic(count, rng)
+    print(f"{count:,} emails, {len(bitmaps.bitmaps)} bitmaps generated in {time.perf_counter() - start:.1f} s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.bitmaps")
+        start = time.perf_counter()
+        bitmaps.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = SiteBitmaps(path)
+        print(f"saved in {saved:.1f} s ({os.path.getsize(path) / 2**20:.0f} MiB), "
+              f"loaded in {time.perf_counter() - start:.1f} s")
+
+    for query in QUERIES:
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            found = len(loaded.query(query))
+            best = min(best, time.perf_counter() - start)
+        print(f"  {best * 1000:7.1f} ms  {found:>11,}  {query}")
+
+    print(f"building from the result stream: {add_rate():,.0f} results/s")
@@ -0,0 +1,28 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core.classify import DomainIndex, build_index
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rng = random.Random(0)
+    domains = [f"d{rng.getrandbits(48):x}.com" for _ in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "domains.idx")
+        build_index({"disposable": domains[: n // 2], "free": domains[n // 2:]}, path)
+        print(f"index: {n:,} domains, {os.path.getsize(path) / n:.1f} bytes/domain")
+
+        start = time.perf_counter()
+        index = DomainIndex(path)
+        print(f"open: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+        queries = [f"mx.{d}" for d in rng.sample(domains, 10_000)] + [f"x{i}.example.org" for i in range(10_000)]
+        start = time.perf_counter()
+        for q in queries:
+            index.classify(q)
+        print(f"classify: {(time.perf_counter() - start) / len(queries) * 1e6:.1f} us/lookup")
+        index.close()
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+from storage.columnar import ColumnarReader, ColumnarWriter
+from storage.jsonl import ResultWriter, read_results
+from storage.records import SITE_NAMES, TEMPLATES
+
+# Loading results for analysis: the columnar file (memory-mapped, columns
+# viewed in place) against parsing the JSONL result file. JSON is timed on a
+# sample and scaled to the full row count.
+
+JSON_SAMPLE = 200_000
+
+
+def result(i):
+    username = f"user.{i}"
+    domain = f"d{i % 50_000}.example.com"
+    return {"email": f"{username}@{domain}", "username": username, "domain": domain,
+            "domain_type": "corporate", "mx": i % 5 != 0, "dns": None, "gravatar": None,
+            "accounts": {name: TEMPLATES[s].format(username) for s, name in enumerate(SITE_NAMES) if (i >> s) % 3 == 0},
+            "profiles": {}, "dorks": {}, "search": {}}
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.col")
+        start = time.perf_counter()
+        with ColumnarWriter(path) as writer:
+            for i in range(count):
+                writer.write(result(i))
+        print(f"wrote {count:,} rows in {time.perf_counter() - start:.1f} s ({os.path.getsize(path) / 2**20:.0f} MiB)")
+
+        start = time.perf_counter()
+        reader = ColumnarReader(path)
+        flags = reader.columns("flags")
+        domains = reader.columns("domain_id")
+        loaded = time.perf_counter() - start
+        assert sum(map(len, flags)) == count
+        print(f"columnar: opened and mapped {count:,} rows in {loaded * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        github = reader.site_bit("GitHub")
+        found = sum(sum(1 for value in view if value & github) for view in flags)
+        print(f"  scanned the flags column (GitHub: {found:,}) in {time.perf_counter() - start:.2f} s")
+        del flags, domains
+        reader.close()
+
+        jsonl = os.path.join(tmp, "results.json")
+        with ResultWriter(jsonl) as writer:
+            for i in range(JSON_SAMPLE):
+                writer.write(result(i))
+        start = time.perf_counter()
+        rows = sum(1 for _ in read_results(jsonl))
+        parsed = (time.perf_counter() - start) * count / rows
+        print(f"JSONL: parsing {count:,} rows takes about {parsed:.1f} s (scaled from {rows:,})")
+        print(json.dumps({"rows": count, "columnar_load_s": round(loaded, 4), "json_load_s": round(parsed, 1)}))
@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+from storage.database import ResultStore
+
+SITES = ["GitHub", "Twitter", "Instagram", "Facebook", "Reddit", "Medium"]
+
+
+def make_record(i, rng):
+    username = f"user{i}"
+    return {
+        "email": f"{username}@example{i % 1000}.com",
+        "username": username,
+        "domain": f"example{i % 1000}.com",
+        "mx": True,
+        "gravatar": None,
+        "accounts": {site: f"https://{site.lower()}.com/{username}" for site in SITES if rng.random() < 0.3},
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with ResultStore(os.path.join(tmp, "results.db"), batch_size=10_000) as store:
+            start = time.perf_counter()
+            for i in range(n):
+                store.write(make_record(i, rng))
+            store.flush()
+            elapsed = time.perf_counter() - start
+            print(f"insert: {n / elapsed:,.0f} emails/s")
+
+            for query, args in [(store.emails_on, ("GitHub", "Reddit")),
+                                (store.emails_by_username, ("user4242",)),
+                                (store.emails_by_domain, ("example42.com",))]:
+                start = time.perf_counter()
+                rows = query(*args)
+                print(f"{query.__name__}{args}: {len(rows):,} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from core.distributed import run_coordinator, run_sink, run_worker
+from storage.jsonl import read_results
+from storage.outputs import Outputs
+
+LATENCY = 0.005  # simulated network time per email
+
+
+def fake_process(emails):
+    time.sleep(LATENCY * len(emails))
+    results = []
+    for email in emails:
+        username, domain = email.split("@")
+        results.append({"email": email, "username": username, "domain": domain, "domain_type": "corporate",
+                        "mx": True, "dns": {"has_mx": True, "null_mx": False, "mx": [], "spf": None, "dmarc": None},
+                        "gravatar": None, "accounts": {}})
+    return results
+
+
+def endpoints(base):
+    return [f"tcp://localhost:{base + i}" for i in range(3)]
+
+
+def coordinator(n, base, lease_timeout):
+    work, _, acks = endpoints(base)
+    records = ((f"user{i}", "example.com") for i in range(n))
+    run_coordinator(records, batch_size=20, lease_timeout=lease_timeout, work=work, acks=acks, linger=1.0)
+
+
+def sink(tmp, base):
+    _, results, acks = endpoints(base)
+    with Outputs(os.path.join(tmp, "results.json"), report=os.path.join(tmp, "report.txt")) as outputs:
+        run_sink(outputs, results, acks)
+
+
+def worker(base):
+    work, results, _ = endpoints(base)
+    run_worker(work, results, process=fake_process, timeout=5.0, retries=1)
+
+
+def run(n, workers, base, kill_one=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=coordinator, args=(n, base, 2.0)),
+                 multiprocessing.Process(target=sink, args=(tmp, base))]
+        procs += [multiprocessing.Process(target=worker, args=(base,)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        if kill_one:
+            time.sleep(0.5)
+            procs[-1].kill()
+        procs[1].join()
+        elapsed = time.perf_counter() - start
+        for p in procs:
+            p.join()
+        stored = {r["email"] for r in read_results(os.path.join(tmp, "results.json"))}
+    return elapsed, len(stored)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    base = 25557
+    for workers in (1, 2, 4, 8):
+        elapsed, stored = run(n, workers, base)
+        print(f"{workers} worker(s): {stored:,}/{n:,} emails in {elapsed:.2f}s ({stored / elapsed:,.0f}/s)")
+        base += 3
+    elapsed, stored = run(n, 4, base, kill_one=True)
+    print(f"4 workers, one killed: {stored:,}/{n:,} emails in {elapsed:.2f}s")
@@ -0,0 +1,68 @@
+import json
+import sys
+import time
+
+from core.extract import extract
+from modules.profiles import PROFILE_FIELDS
+
+# Synthetic stand-ins for captured profile pages, built like the real ones:
+# a script-heavy <head> with the og:/description tags, a large markup body,
+# and (GitHub-style) JSON-LD near the end of the body.
+
+SCRIPT = "<script>window.__data = {\"k\": \"<meta property='og:title' content='decoy'>\"};" + "var a=1;" * 2000 + \
+         "</script>\n"
+BODY_ROW = "<div class=\"row\"><a href=\"/p/abc\"><img src=\"/i.jpg\" alt=\"post\"></a><span>caption text</span></div>\n"
+
+
+def fixture(site, size=500_000):
+    if site == "Instagram":
+        head = ("<meta property=\"og:title\" content=\"Jane Doe (@jdoe) &bull; Instagram photos and videos\">"
+                "<meta property=\"og:description\" content=\"1.2M Followers, 310 Following, 52 Posts - See photos\">"
+                "<meta name=\"description\" content=\"jdoe on Instagram: &quot;Photographer in Lisbon&quot;\">")
+        tail = ""
+    elif site == "GitHub":
+        head = ("<meta property=\"og:title\" content=\"jdoe - Overview\">"
+                "<meta name=\"description\" content=\"Jane Doe builds compilers.\">")
+        person = {"@context": "https://schema.org", "@type": "ProfilePage", "mainEntity": {
+            "@type": "Person", "name": "Jane Doe", "description": "Compilers and coffee",
+            "sameAs": ["https://jdoe.dev", "https://mastodon.social/@jdoe"],
+            "interactionStatistic": [{"@type": "InteractionCounter",
+                                      "interactionType": "https://schema.org/FollowAction",
+                                      "userInteractionCount": 4521}]}}
+        tail = f"<script type=\"application/ld+json\">{json.dumps(person)}</script>"
+    else:
+        head, tail = "", ""
+    start = f"<!DOCTYPE html><html><head><title>{site}</title>{SCRIPT * 5}{head}<style>.x{{}}</style></head><body>"
+    rows = max(0, size - len(start) - len(tail)) // len(BODY_ROW)
+    return (start + BODY_ROW * rows + tail + "</body></html>").encode()
+
+
+def full_parse(data, spec):
+    # The straightforward way: a whole BeautifulSoup tree, then look up the tags.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(data, "html.parser")
+    meta = {(tag.get("property") or tag.get("name")): tag.get("content") for tag in soup.find_all("meta")}
+    ld = [json.loads(tag.string) for tag in soup.find_all("script", type="application/ld+json")]
+    return meta, ld
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    for site, spec in (("Instagram", PROFILE_FIELDS["Instagram"]), ("GitHub", PROFILE_FIELDS["GitHub"]),
+                       ("no metadata", PROFILE_FIELDS["GitHub"])):
+        data = fixture(site, size)
+        fast, fields = timed(extract, data, spec)
+        slow, _ = timed(full_parse, data, spec, repeat=2)
+        print(f"{site}: {len(data) / 1024:.0f} KiB, extract {fast * 1000:.2f} ms, "
+              f"BeautifulSoup {slow * 1000:.0f} ms ({100 * fast / slow:.2f}%)")
+        print(f"  {fields}")
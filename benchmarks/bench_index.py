@@ -0,0 +1,37 @@
+import sys
+import tempfile
+import time
+
+from storage.index import InvertedIndex
+
+
+def make_record(i):
+    username = f"user{i}"
+    return {
+        "email": f"{username}@example{i % 1000}.com",
+        "username": username,
+        "domain": f"example{i % 1000}.com",
+        "accounts": {"GitHub": f"https://github.com/{username}"} if i % 3 == 0 else {},
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        with InvertedIndex(tmp, buffer_size=1_000_000) as index:
+            start = time.perf_counter()
+            for i in range(n):
+                index.add(make_record(i))
+            index.flush()
+            index.compact()
+            print(f"indexed {n:,} emails in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index = InvertedIndex(tmp)
+        print(f"open: {(time.perf_counter() - start) * 1000:.2f} ms")
+        for kind, value in [("username", f"user{n // 2}"), ("domain", "example42.com"),
+                            ("profile", "https://github.com/user3"), ("username", "nobody")]:
+            start = time.perf_counter()
+            emails = index.lookup(kind, value)
+            print(f"{kind} {value}: {len(emails):,} emails in {(time.perf_counter() - start) * 1000:.2f} ms")
+        index.close()
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+import time
+
+from core.email_utils import parse_emails
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    lines = [f"User{i}.Name+tag@Example{i % 1000}.com\n" for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "emails.txt")
+        with open(path, "w") as f:
+            f.writelines(lines)
+
+        for label, source in [("file", path), ("lines", lines)]:
+            stats = {}
+            start = time.perf_counter()
+            for _ in parse_emails(source, stats):
+                pass
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {stats['parsed']:,} parsed, {stats['rejected']:,} rejected, {n / elapsed:,.0f} lines/s")
@@ -0,0 +1,155 @@
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import core.domain
+import core.pages
+from benchmarks.internet import Internet, default_profiles, point_resolver, route
+from core import metrics
+from core.http import get_session
+from core.pipeline import DEFAULT_STAGES, STAGES, batches, process_batch
+
+# End-to-end run of the pipeline against local stand-ins for every probed
+# site, Gravatar and DNS, at several concurrency levels. Prints a JSON report
+# (throughput, latency percentiles, memory) that can be saved per commit and
+# compared with --compare. The emails go through process_batch as in a scan:
+# one at a time, or in batches of --batch-size when the dorks and search
+# stages (which work on whole batches) run, and latency is then per batch.
+
+BATCH_STAGES = ("dorks", "search")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def max_rss_mib():
+    # ru_maxrss is in KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def http_statuses():
+    counts = {}
+    for (name, labels), value in metrics.REGISTRY.samples().items():
+        if name == "osint_http_requests_total":
+            status = dict(labels)["status"]
+            counts[status] = counts.get(status, 0) + value
+    return counts
+
+
+def reset_caches():
+    core.domain._mx_cache.clear()
+    core.domain._intel_cache.clear()
+    core.domain.get_resolver().cache.flush()
+
+
+def run_level(records, concurrency, stages, batch_size, search_rate):
+    reset_caches()
+    if "search" in stages:
+        # a fresh searcher, so every level starts with a cold result cache
+        from dorks.search import SEARCH_BACKEND, use_backend
+
+        use_backend(SEARCH_BACKEND, search_rate)
+    before = http_statuses()
+    latencies = []
+
+    def timed(batch):
+        start = time.perf_counter()
+        process_batch(batch, {}, stages=stages)
+        latencies.append(time.perf_counter() - start)
+
+    size = batch_size if any(stage in stages for stage in BATCH_STAGES) else 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, batches(records, size)))
+    elapsed = time.perf_counter() - start
+    after = http_statuses()
+    return {
+        "concurrency": concurrency,
+        "emails": len(records),
+        "batch_size": size,
+        "seconds": round(elapsed, 4),
+        "emails_per_second": round(len(records) / elapsed, 2),
+        "latency_ms": {name: round(percentile(latencies, q) * 1000, 2)
+                       for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+        "http_requests": {status: after[status] - before.get(status, 0) for status in after
+                          if after[status] != before.get(status, 0)},
+        "max_rss_mib": round(max_rss_mib(), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    old = {run["concurrency"]: run for run in baseline["runs"]}
+    print(f"\n{baseline.get('commit')} -> {report.get('commit')}", file=sys.stderr)
+    for run in report["runs"]:
+        before = old.get(run["concurrency"])
+        if before is None:
+            continue
+        print(f"concurrency {run['concurrency']:>4}: "
+              f"{run['emails_per_second'] / before['emails_per_second']:.2f}x throughput, "
+              f"p50 {before['latency_ms']['p50']} -> {run['latency_ms']['p50']} ms, "
+              f"p99 {before['latency_ms']['p99']} -> {run['latency_ms']['p99']} ms, "
+              f"rss {before['max_rss_mib']} -> {run['max_rss_mib']} MiB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--emails", type=int, default=400, help="emails per concurrency level")
+    parser.add_argument("--domains", type=int, default=50, help="distinct email domains")
+    parser.add_argument("--concurrency", default="4,16,64", help="comma-separated levels")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES), help=f"from {','.join(STAGES)}")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean site response time (s)")
+    parser.add_argument("--dns-latency", type=float, default=0.005, help="mean DNS response time (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of site requests failing with 503")
+    parser.add_argument("--page-size", type=int, default=0, help="pad site pages to this many bytes")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="emails per batch when the dorks or search stage runs")
+    parser.add_argument("--search-rate", type=float, default=0, help="searches per second (0: no limit)")
+    parser.add_argument("--html-workers", type=int, default=core.pages.WORKERS,
+                        help="processes parsing pages (0: parse in the probing thread)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    stages = tuple(args.stages.split(","))
+    if "search" in stages and "dorks" not in stages:
+        parser.error("the search stage needs the dorks stage")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    records = [(f"user{i}", f"d{i % args.domains}.example") for i in range(args.emails)]
+
+    core.pages.WORKERS = args.html_workers
+    with Internet(default_profiles(args.latency, args.error_rate, args.page_size), args.dns_latency) as internet:
+        route(get_session(), internet.http_port)
+        point_resolver(core.domain.get_resolver(), internet.dns_port)
+        runs = [run_level(records, level, stages, args.batch_size, args.search_rate) for level in levels]
+    core.pages.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        "runs": runs,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
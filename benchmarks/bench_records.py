@@ -0,0 +1,63 @@
+import sys
+import time
+import tracemalloc
+
+from storage.records import SITE_NAMES, Record, RecordTable, TEMPLATES, flags_of
+
+# Memory per email of the probe results held as result dicts, as Record
+# objects and in a RecordTable. Dicts and Records are measured on a sample
+# and scaled to the full count (10M dicts do not fit in memory here); the
+# table is filled with the full count.
+
+SAMPLE = 200_000
+
+
+def result(i):
+    username = f"user.{i}"
+    accounts = {name: TEMPLATES[s].format(username) for s, name in enumerate(SITE_NAMES) if (i >> s) % 3 == 0}
+    return {"email": f"{username}@d{i % 50_000}.example.com", "username": username,
+            "domain": f"d{i % 50_000}.example.com", "mx": i % 5 != 0, "gravatar": None, "accounts": accounts}
+
+
+def measured(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, size, elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    scale = count / SAMPLE
+
+    _, dict_bytes, _ = measured(lambda: [result(i) for i in range(SAMPLE)])
+    sample = [result(i) for i in range(SAMPLE)]
+    _, record_bytes, _ = measured(lambda: [Record.from_result(r) for r in sample])
+    del sample
+
+    table = RecordTable()
+    start = time.perf_counter()
+    for i in range(count):
+        username = f"user.{i}"
+        flags = sum(1 << s for s in range(len(SITE_NAMES)) if (i >> s) % 3 == 0) | (1 << 63 if i % 5 else 0)
+        table.append(username, f"d{i % 50_000}.example.com", flags)
+    elapsed = time.perf_counter() - start
+    table_bytes = table.nbytes() + sum(sys.getsizeof(d) for d in table.domains)
+
+    print(f"{count:,} emails:")
+    print(f"  result dicts: {dict_bytes * scale / 2**20:>9,.0f} MiB ({dict_bytes / SAMPLE:.0f} B/email, "
+          f"scaled from {SAMPLE:,})")
+    print(f"  Record:       {record_bytes * scale / 2**20:>9,.0f} MiB ({record_bytes / SAMPLE:.0f} B/email, "
+          f"scaled from {SAMPLE:,}, usernames shared with the results)")
+    print(f"  RecordTable:  {table_bytes / 2**20:>9,.0f} MiB ({table_bytes / count:.0f} B/email, "
+          f"filled in {elapsed:.1f} s)")
+
+    i = count // 3
+    assert table[i].accounts == {site: url for site, url in result(i)["accounts"].items()}
+    assert table.flags(i) == flags_of(result(i))
+    start = time.perf_counter()
+    found = table.count("GitHub")
+    print(f"  GitHub found for {found:,} emails, counted in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,18 @@
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_writer import make_record
+from core.report import build_report
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_report((make_record(i) for i in range(n)), os.path.join(tmp, "report.txt"))
+        elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{n:,} emails in {elapsed:.2f}s ({n / elapsed:,.0f} emails/s), max RSS {rss / 1024:.0f} MiB")
@@ -0,0 +1,78 @@
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from dorks.google_dorks import get_dorks
+from storage.outputs import Outputs
+
+# Cost of schema validation on the write path: the time Outputs (JSONL file
+# and report) takes to write results with a validator, against the same
+# outputs without one. Results are complete default-stage records with dorks,
+# the dns object shared per domain as it is in the pipeline. Separate runs
+# differ by more than the validation costs on a busy machine, so both write
+# the same blocks of results in turn (alternating which goes first), and the
+# median of ROUNDS runs is kept.
+
+DOMAINS = 1_000
+RATIOS = (1.0, 0.1)
+ROUNDS = 7
+
+
+def make_results(n):
+    dorks = get_dorks()
+    dns = [{"has_mx": True, "null_mx": False, "spf": "v=spf1 -all", "dmarc": None,
+            "mx": [{"host": f"mx{j}.d{i}.example", "priority": 10 * j, "addresses": [f"192.0.2.{j}"]}
+                   for j in (1, 2)]}
+           for i in range(DOMAINS)]
+    results = []
+    for i in range(n):
+        username, domain = f"user{i}", f"d{i % DOMAINS}.example"
+        results.append({
+            "email": f"{username}@{domain}",
+            "username": username,
+            "domain": domain,
+            "domain_type": "corporate",
+            "mx": True,
+            "dns": dns[i % DOMAINS],
+            "gravatar": None if i % 3 else f"https://www.gravatar.com/avatar/{i:032x}",
+            "accounts": {"GitHub": f"https://github.com/{username}",
+                         "Reddit": f"https://www.reddit.com/user/{username}"},
+            "profiles": {},
+            "dorks": dorks.generate(username, domain),
+            "search": {},
+        })
+    return results
+
+
+def overhead(results, sample, block=1_000):
+    # (extra write time with validation, share of results checked, write time per result)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = Outputs(os.path.join(tmp, "plain.json"), report=os.path.join(tmp, "plain.txt"))
+        checked = Outputs(os.path.join(tmp, "checked.json"), report=os.path.join(tmp, "checked.txt"), validate=sample)
+        checked.validator.path = os.path.join(tmp, "violations.jsonl")
+        times = {plain: 0.0, checked: 0.0}
+        gc.collect()
+        for i in range(0, len(results), block):
+            chunk = results[i:i + block]
+            for outputs in (plain, checked) if i // block % 2 else (checked, plain):
+                start = time.perf_counter()
+                for result in chunk:
+                    outputs.write(result)
+                times[outputs] += time.perf_counter() - start
+        validated, violations = checked.validator.checked, checked.validator.violations
+        plain.close()
+        checked.close()
+        assert violations == 0
+        return times[checked] / times[plain] - 1, validated / len(results), times[plain] / len(results)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    results = make_results(n)
+    for sample in RATIOS:
+        runs = sorted(overhead(results, sample) for _ in range(ROUNDS))
+        share, full, write = runs[len(runs) // 2]
+        print(f"validate {sample:g}: +{share * 100:.1f}% of the write time ({write * 1e6:.1f} us/result), "
+              f"{full:.2%} of the results checked")
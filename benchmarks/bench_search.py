@@ -0,0 +1,54 @@
+import argparse
+import time
+
+import dorks.google_dorks
+import dorks.search
+from benchmarks.internet import Internet, default_profiles, route
+from core import metrics
+from core.http import get_session
+from core.pipeline import batches, process_batch
+
+# Runs the dorks and search stages against a local stand-in search engine:
+# a cold pass, then the same emails again as a new run (fresh dork
+# deduplication, warm result cache), which should send no searches at all.
+
+
+def cache_counts():
+    counts = {"hit": 0, "miss": 0}
+    for (name, labels), value in metrics.REGISTRY.samples().items():
+        labels = dict(labels)
+        if name == "osint_cache_requests_total" and labels["cache"] == "serp":
+            counts[labels["result"]] += value
+    return counts
+
+
+def run(records, batch_size):
+    dorks.google_dorks._dorks = dorks.google_dorks.Dorks()
+    before = cache_counts()
+    start = time.perf_counter()
+    links = 0
+    for batch in batches(records, batch_size):
+        for result in process_batch(batch, {}, stages=("dorks", "search")):
+            links += sum(map(len, result["search"].values()))
+    elapsed = time.perf_counter() - start
+    after = cache_counts()
+    return elapsed, links, after["hit"] - before["hit"], after["miss"] - before["miss"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search stage against a stub search engine")
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--domains", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean search response time (s)")
+    parser.add_argument("--rate", type=float, default=0, help="searches per second (0: no limit)")
+    args = parser.parse_args()
+
+    records = [(f"user{i}", f"d{i % args.domains}.example") for i in range(args.emails)]
+    with Internet(default_profiles(args.latency)) as internet:
+        route(get_session(), internet.http_port)
+        dorks.search.use_backend(dorks.search.SEARCH_BACKEND, args.rate)
+        for name in ("cold", "warm"):
+            elapsed, links, hits, misses = run(records, args.batch_size)
+            print(f"{name}: {args.emails} emails in {elapsed:.2f} s, {misses} searches sent, "
+                  f"{hits} answered from cache, {links} result links")
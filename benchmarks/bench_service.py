@@ -0,0 +1,61 @@
+import asyncio
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.service import Service
+
+DELAY = 0.2  # simulated pipeline time per email
+
+
+def fake_lookup(username, domain):
+    time.sleep(DELAY)
+    return {"email": f"{username}@{domain}", "username": username, "domain": domain, "accounts": {}}
+
+
+def start(port):
+    service = Service(lookup=fake_lookup, probe=lambda username: {})
+    ready = threading.Event()
+
+    async def run():
+        service.make_app().listen(port, "127.0.0.1")
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    ready.wait()
+    return service
+
+
+def get(port, path, conn=None):
+    conn = conn or http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    port = 18080
+    service = start(port)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        statuses = list(pool.map(lambda _: get(port, "/email/J.Doe+x@GMail.com")[0], range(50)))
+    print(f"50 concurrent identical lookups: {time.perf_counter() - start_time:.2f}s, "
+          f"statuses {set(statuses)}, stats {service.emails.stats}")
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    for _ in range(n):
+        t = time.perf_counter()
+        get(port, "/email/jdoe@googlemail.com", conn)
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    print(f"cached lookups: p50 {statistics.median(latencies) * 1000:.3f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms")
+    print(json.loads(get(port, "/stats")[1]))
@@ -0,0 +1,27 @@
+import sys
+import time
+
+from benchmarks.smtp_stub import SMTPStub
+from core.smtp import SMTPVerifier
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    hosts = ["127.0.0.1", "localhost"]
+    stub = SMTPStub(mailboxes=[f"user{i}@example{i % 20}.com" for i in range(0, n, 2)],
+                    catch_all_domains=["catchall.example"]).start()
+    items = [(f"user{i}@example{i % 20}.com", f"example{i % 20}.com", [hosts[i % 2]]) for i in range(n)]
+    items.append(("anyone@catchall.example", "catchall.example", [hosts[0]]))
+
+    verifier = SMTPVerifier(port=stub.port, per_host=4, max_rcpt=100)
+    start = time.perf_counter()
+    statuses = verifier.verify(items)
+    elapsed = time.perf_counter() - start
+    verifier.close()
+    stub.stop()
+
+    counts = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    print(f"{len(statuses):,} addresses in {elapsed:.2f}s ({len(statuses) / elapsed:,.0f}/s) "
+          f"over {verifier.sessions} sessions: {counts}")
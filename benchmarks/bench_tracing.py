@@ -0,0 +1,65 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import core.pipeline
+from core import tracing
+from modules.social_accounts import SOCIAL_SITES
+
+SITES = [url.split("/")[2] for url in SOCIAL_SITES.values()]
+
+
+def fake_social(delay):
+    def probe(username, pages=None):
+        for site in SITES:
+            with tracing.span("http", site=site) as span:
+                if delay:
+                    time.sleep(delay(site))
+                span.set(status=404)
+        return {}
+    return probe
+
+
+def use_stubs(delay=None):
+    core.pipeline.domain_intel = lambda domain: {"has_mx": True, "null_mx": False, "mx": [], "spf": None,
+                                                 "dmarc": None}
+    core.pipeline.gravatar_lookup = lambda email: None
+    core.pipeline.find_social_accounts = fake_social(delay)
+
+
+def per_email(n):
+    start = time.perf_counter()
+    for i in range(n):
+        core.pipeline.lookup(f"user{i}", "example.com")
+    return (time.perf_counter() - start) / n
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    use_stubs()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        off = per_email(n)
+        tracing.start(path)
+        on = per_email(n)
+        tracing.stop()
+        tracing.start(path + ".sampled", sample=0.01)
+        sampled = per_email(n)
+        tracing.stop()
+        print(f"{n:,} emails, {len(SITES) + 5} spans each")
+        print(f"tracing off: {off * 1e6:.1f} us/email")
+        print(f"tracing on:  {on * 1e6:.1f} us/email (+{(on - off) * 1e6:.1f} us, "
+              f"{os.path.getsize(path) / n:.0f} bytes)")
+        print(f"1% sampled:  {sampled * 1e6:.1f} us/email")
+
+        # A small run with a slow site, then the analyzer on it.
+        rng = random.Random(0)
+        use_stubs(lambda site: rng.expovariate(1 / (0.02 if site == "medium.com" else 0.002)))
+        path = os.path.join(tmp, "slow.jsonl")
+        tracing.start(path)
+        per_email(50)
+        tracing.stop()
+        subprocess.run([sys.executable, "-m", "core.tracing", path, "--top", "1"], check=True)
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+from storage.jsonl import ResultWriter, read_results
+
+
+def make_record(i):
+    username = f"user{i}"
+    return {
+        "email": f"{username}@example.com",
+        "username": username,
+        "domain": "example.com",
+        "mx": True,
+        "gravatar": None,
+        "accounts": {"GitHub": f"https://github.com/{username}", "Reddit": f"https://www.reddit.com/user/{username}"},
+    }
+
+
+def bench(n, compress):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.json")
+        records = [make_record(i) for i in range(n)]
+        start = time.perf_counter()
+        with ResultWriter(path, compress=compress) as writer:
+            for record in records:
+                writer.write(record)
+        elapsed = time.perf_counter() - start
+        assert sum(1 for _ in read_results(path)) == n
+        return n / elapsed, os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    for compress in (False, True):
+        rate, size = bench(n, compress)
+        print(f"{'gzip' if compress else 'plain'}: {rate:,.0f} records/s, {size / n:.1f} bytes/record")
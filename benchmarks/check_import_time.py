@@ -0,0 +1,38 @@
+import os
+import re
+import subprocess
+import sys
+
+from storage.jsonl import ROOT
+
+BUDGET_MS = 150.0
+# Stage dependencies that must only be imported by the stage that needs them.
+HEAVY = ("dns", "requests", "bs4", "jinja2", "zmq", "tornado")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(args=("--help",)):
+    # -X importtime writes one line per module to stderr: self us | cumulative us | name,
+    # indented by nesting depth.
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py"), *args],
+                          capture_output=True, text=True, cwd=ROOT)
+    modules = {}
+    for match in LINE.finditer(proc.stderr):
+        _, cumulative, indent, name = match.groups()
+        modules[name] = (int(cumulative) / 1000, not indent)
+    return modules
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    modules = import_times()
+    total = sum(ms for ms, top in modules.values() if top)
+    for name, (ms, top) in sorted(modules.items(), key=lambda item: -item[1][0])[:10]:
+        print(f"{ms:8.1f} ms  {name}")
+    print(f"total: {total:.1f} ms (budget {budget:.0f} ms)")
+
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY)
+    if heavy:
+        sys.exit(f"imported at startup: {', '.join(heavy)}")
+    if total > budget:
+        sys.exit(f"startup imports over budget: {total:.1f} ms > {budget:.0f} ms")
@@ -0,0 +1,256 @@
+import http.server
+import multiprocessing
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote_plus, urlsplit
+
+from core.http import POOL_SIZE
+from modules.dev_plateforms import DEVS
+from modules.forums import FORUMS
+from modules.social_accounts import SOCIAL_SITES
+
+# latency: mean seconds per response (exponentially distributed).
+# error_rate: fraction of requests answered with 503.
+# soft_404: unknown profiles get a 200 "not found" page instead of a 404.
+# page_size: pages are padded to about this many bytes (markup-heavy body).
+Profile = namedtuple("Profile", "latency error_rate soft_404 page_size", defaults=(0.02, 0.0, False, 0))
+
+GRAVATAR_HOST = "www.gravatar.com"
+SEARCH_HOST = "www.google.com"
+SOFT_404_HOSTS = {"www.instagram.com", "www.facebook.com"}
+
+
+def site_hosts():
+    urls = list(SOCIAL_SITES.values()) + list(FORUMS.values()) + list(DEVS.values())
+    return sorted({urlsplit(url).hostname for url in urls} | {GRAVATAR_HOST, SEARCH_HOST})
+
+
+def default_profiles(latency=0.02, error_rate=0.0, page_size=0):
+    return {host: Profile(latency, error_rate, host in SOFT_404_HOSTS, page_size) for host in site_hosts()}
+
+
+def page(title, text, size=0):
+    head = (f"<html><head><title>{title}</title><meta property=\"og:title\" content=\"{title}\">"
+            f"<meta property=\"og:description\" content=\"{text}\"></head>")
+    body = f"<body><p>{text}</p>"
+    filler = "<div class=\"x\"><span>lorem ipsum</span><a href=\"/p\">link</a></div>\n"
+    count = max(0, size - len(head) - len(body)) // len(filler)
+    return (head + body + filler * count + "</body></html>").encode()
+
+
+def serp(query, results=8):
+    # A search result page: navigation links back to the engine, then results
+    # (some behind /url?q= redirects). Queries hashing to 0 mod 4 find nothing.
+    seed = zlib.crc32(query.encode())
+    links = [f"https://site{(seed + i) % 97}.example.org/{seed % 1000}/{i}" for i in range(results if seed % 4 else 0)]
+    items = "".join(f"<div class=\"g\"><a href=\"{'/url?q=' + quote_plus(link) + '&amp;sa=U' if i % 2 else link}\">"
+                    f"<h3>result {i}</h3></a></div>" for i, link in enumerate(links))
+    return (f"<html><head><title>{query} - Search</title></head><body>"
+            f"<a href=\"/\">Home</a><a href=\"https://{SEARCH_HOST}/preferences\">Settings</a>{items}"
+            f"<a href=\"/search?q={quote_plus(query)}&amp;start=10\">Next</a></body></html>").encode()
+
+
+def exists(host, key, ratio=10):
+    # Deterministic: about one profile (or avatar hash) in `ratio` exists.
+    return zlib.crc32(f"{host}/{key}".encode()) % ratio == 0
+
+
+class SiteStub(http.server.ThreadingHTTPServer):
+    # One local HTTP server standing in for every probed site and Gravatar,
+    # told apart by the Host header.
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, profiles=None, address=("127.0.0.1", 0), seed=0):
+        self.profiles = profiles or default_profiles()
+        self.requests = 0
+        self._random = random.Random(seed)
+        super().__init__(address, _SiteHandler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _SiteHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        host = self.headers.get("Host", "").split(":")[0]
+        profile = server.profiles.get(host)
+        if profile is None:
+            return self.respond(404, b"unknown site")
+        time.sleep(server._random.expovariate(1 / profile.latency) if profile.latency else 0)
+        if server._random.random() < profile.error_rate:
+            return self.respond(503, b"try again later")
+        if host == SEARCH_HOST and self.path.startswith("/search?"):
+            return self.respond(200, serp(parse_qs(urlsplit(self.path).query).get("q", [""])[0]))
+        key = self.path.strip("/").split("?")[0].rpartition("/")[2].lstrip("@")
+        if exists(host, key):
+            return self.respond(200, page(key, f"profile of {key}", profile.page_size))
+        if profile.soft_404:
+            return self.respond(200, page("Page not found", "Sorry, this page isn't available.", profile.page_size))
+        self.respond(404, page("404", "Not found"))
+
+    def respond(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DNSStub:
+    # UDP DNS server answering for any domain: two MX hosts (glue for the
+    # first only, so the second costs A/AAAA queries), SPF and DMARC TXT,
+    # and A/AAAA for the mail hosts. Domains starting with "nx" do not
+    # exist; domains starting with "nullmx" publish a null MX.
+
+    def __init__(self, latency=0.005, address=("127.0.0.1", 0), workers=64, seed=0):
+        self.latency = latency
+        self.queries = 0
+        self._random = random.Random(seed)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(address)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dns-stub")
+
+    @property
+    def port(self):
+        return self._sock.getsockname()[1]
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._sock.close()
+        self._pool.shutdown(wait=False)
+
+    def _serve(self):
+        while True:
+            try:
+                data, peer = self._sock.recvfrom(4096)
+            except OSError:
+                return
+            self.queries += 1
+            self._pool.submit(self._answer, data, peer)
+
+    def _answer(self, data, peer):
+        import dns.message
+        import dns.rcode
+        import dns.rdatatype
+        import dns.rrset
+
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        labels = name.rstrip(".").split(".")
+        domain = ".".join(labels[1:]) if labels[0] in ("_dmarc", "mx1", "mx2") else ".".join(labels)
+
+        if domain.startswith("nx"):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif rdtype == "MX" and labels[0] not in ("_dmarc", "mx1", "mx2"):
+            if domain.startswith("nullmx"):
+                response.answer.append(dns.rrset.from_text(name, 300, "IN", "MX", "0 ."))
+            else:
+                response.answer.append(dns.rrset.from_text(name, 300, "IN", "MX",
+                                                           f"10 mx1.{name}", f"20 mx2.{name}"))
+                response.additional.append(dns.rrset.from_text(f"mx1.{name}", 300, "IN", "A", "192.0.2.1"))
+        elif rdtype == "TXT" and labels[0] == "_dmarc":
+            response.answer.append(dns.rrset.from_text(name, 300, "IN", "TXT", '"v=DMARC1; p=reject"'))
+        elif rdtype == "TXT":
+            spf = f'"v=spf1 include:_spf.{domain} -all"'
+            response.answer.append(dns.rrset.from_text(name, 300, "IN", "TXT", spf))
+        elif rdtype == "A" and labels[0] in ("mx1", "mx2"):
+            response.answer.append(dns.rrset.from_text(name, 300, "IN", "A", "192.0.2.2"))
+        elif rdtype == "AAAA" and labels[0] in ("mx1", "mx2"):
+            response.answer.append(dns.rrset.from_text(name, 300, "IN", "AAAA", "2001:db8::2"))
+
+        if self.latency:
+            time.sleep(self._random.expovariate(1 / self.latency))
+        try:
+            self._sock.sendto(response.to_wire(), peer)
+        except OSError:
+            pass
+
+
+def route(session, port, host="127.0.0.1"):
+    # Sends every request of a requests session to the local SiteStub, keeping
+    # the original host in the Host header (and so in metrics and traces).
+    from requests.adapters import HTTPAdapter
+
+    class LocalAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.headers["Host"] = urlsplit(request.url).netloc
+            request.url = f"http://{host}:{port}{request.path_url}"
+            return super().send(request, **kwargs)
+
+    adapter = LocalAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def point_resolver(resolver, port, host="127.0.0.1"):
+    resolver.nameservers = [host]
+    resolver.port = port
+    resolver.cache.flush()
+    return resolver
+
+
+def _run_internet(conn, profiles, dns_latency):
+    sites = SiteStub(profiles).start()
+    dns_stub = DNSStub(dns_latency).start()
+    conn.send((sites.port, dns_stub.port))
+    conn.recv()  # any message, or the parent going away, stops the stubs
+    conn.send((sites.requests, dns_stub.queries))
+
+
+class Internet:
+    # The site and DNS stand-ins in a separate process, so serving requests
+    # does not compete with the pipeline for the GIL.
+
+    def __init__(self, profiles=None, dns_latency=0.005):
+        parent, child = multiprocessing.Pipe()
+        self._conn = parent
+        self._process = multiprocessing.Process(target=_run_internet, args=(child, profiles, dns_latency),
+                                                daemon=True)
+        self._process.start()
+        self.http_port, self.dns_port = parent.recv()
+
+    def stop(self):
+        # Returns (HTTP requests served, DNS queries answered).
+        self._conn.send(None)
+        counts = self._conn.recv()
+        self._process.join()
+        return counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
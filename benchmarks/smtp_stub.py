@@ -0,0 +1,62 @@
+import socketserver
+import threading
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    # Minimal local SMTP stand-in: answers EHLO/HELO, MAIL, RCPT, RSET, NOOP
+    # and QUIT, refuses DATA. RCPT is accepted for known mailboxes and for
+    # every address on a catch-all domain.
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailboxes=(), catch_all_domains=(), address=("127.0.0.1", 0)):
+        self.mailboxes = {m.lower() for m in mailboxes}
+        self.catch_all_domains = {d.lower() for d in catch_all_domains}
+        self.sessions = 0
+        self.rcpts = 0
+        super().__init__(address, _Handler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        self.reply("220 stub ESMTP")
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").strip()
+            verb = line[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 8BITMIME")
+            elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                server.rcpts += 1
+                address = line.partition(":")[2].strip().strip("<>").lower()
+                domain = address.rpartition("@")[2]
+                if address in server.mailboxes or domain in server.catch_all_domains:
+                    self.reply("250 OK")
+                else:
+                    self.reply("550 No such user")
+            elif verb == "DATA":
+                self.reply("554 No mail accepted here")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("500 Unknown command")
@@ -0,0 +1,58 @@
+from functools import lru_cache
+
+from core import metrics
+
+CACHE_SIZE = 100_000
+
+# domain: (canonical domain, dots ignored in the local part, sub-address separator)
+PROVIDERS = {
+    "gmail.com": ("gmail.com", True, "+"),
+    "googlemail.com": ("gmail.com", True, "+"),
+    "outlook.com": ("outlook.com", False, "+"),
+    "hotmail.com": ("hotmail.com", False, "+"),
+    "live.com": ("live.com", False, "+"),
+    "icloud.com": ("icloud.com", False, "+"),
+    "me.com": ("icloud.com", False, "+"),
+    "mac.com": ("icloud.com", False, "+"),
+    "proton.me": ("proton.me", False, "+"),
+    "protonmail.com": ("proton.me", False, "+"),
+    "protonmail.ch": ("proton.me", False, "+"),
+    "pm.me": ("proton.me", False, "+"),
+    "fastmail.com": ("fastmail.com", False, "+"),
+    "yandex.ru": ("yandex.ru", False, "+"),
+    "yandex.com": ("yandex.ru", False, "+"),
+    "ya.ru": ("yandex.ru", False, "+"),
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonicalize(username, domain):
+    domain, ignore_dots, separator = PROVIDERS.get(domain, (domain, False, None))
+    if username.startswith('"'):
+        # quoted local parts are compared as written
+        return username, domain
+    username = username.lower()
+    if separator:
+        username = username.split(separator, 1)[0] or username
+    if ignore_dots:
+        username = username.replace(".", "")
+    return username, domain
+
+
+metrics.lru_collector("canonical", canonicalize)
+
+
+def dedupe(records, stats=None):
+    # Drops (username, domain) records whose canonical form was already seen,
+    # keeping the first variant so the network stages run once per mailbox.
+    if stats is None:
+        stats = {}
+    stats.setdefault("duplicates", 0)
+    seen = set()
+    for username, domain in records:
+        key = canonicalize(username, domain)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        yield username, domain
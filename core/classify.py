@@ -0,0 +1,107 @@
+import mmap
+import os
+import struct
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "data")
+INDEX_PATH = os.path.join(DATA_DIR, "domains.idx")
+
+# Earlier categories win when a domain is listed twice.
+CATEGORIES = ("disposable", "free")
+SOURCES = {
+    "disposable": os.path.join(DATA_DIR, "disposable.txt"),
+    "free": os.path.join(DATA_DIR, "freemail.txt"),
+}
+
+# Sorted entries ``domain + category byte`` behind a table of offsets. The file
+# is memory-mapped and binary searched as is: opening it parses nothing.
+MAGIC = b"OSDC"
+_HEADER = struct.Struct("<4sI")
+
+
+def build_index(domains, path=INDEX_PATH):
+    # domains maps each category to an iterable of domain names.
+    entries = {}
+    for code, category in enumerate(CATEGORIES):
+        for domain in domains.get(category, ()):
+            domain = domain.strip().lower().rstrip(".")
+            if domain and not domain.startswith("#"):
+                entries.setdefault(domain.encode("idna"), code)
+
+    offsets = array("I", [0])
+    with open(path + ".tmp", "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(entries)))
+        f.seek(_HEADER.size + 4 * (len(entries) + 1))
+        for domain in sorted(entries):
+            f.write(domain + bytes([entries[domain]]))
+            offsets.append(offsets[-1] + len(domain) + 1)
+        f.seek(_HEADER.size)
+        offsets.tofile(f)
+    os.replace(path + ".tmp", path)
+
+
+class DomainIndex:
+    def __init__(self, path=INDEX_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a domain index")
+        self._base = _HEADER.size + 4 * (self.count + 1)
+        self._offsets = memoryview(self._mm)[_HEADER.size:self._base].cast("I")
+
+    def get(self, domain):
+        # domain is bytes; returns the category code or None.
+        mm, offsets, base = self._mm, self._offsets, self._base
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[base + offsets[mid]:base + offsets[mid + 1] - 1] < domain:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and mm[base + offsets[lo]:base + offsets[lo + 1] - 1] == domain:
+            return mm[base + offsets[lo + 1] - 1]
+        return None
+
+    def classify(self, domain):
+        # Checks the domain, then each parent domain short of the bare TLD,
+        # so mx.eu.mailinator.com matches mailinator.com.
+        try:
+            name = domain.lower().rstrip(".").encode("idna")
+        except UnicodeError:
+            return "corporate"
+        while b"." in name:
+            code = self.get(name)
+            if code is not None:
+                return CATEGORIES[code]
+            name = name.split(b".", 1)[1]
+        return "corporate"
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+
+_index = None
+
+
+def _stale():
+    if not os.path.exists(INDEX_PATH):
+        return True
+    built = os.path.getmtime(INDEX_PATH)
+    return any(os.path.getmtime(source) > built for source in SOURCES.values())
+
+
+def classify_domain(domain):
+    global _index
+    if _index is None:
+        if _stale():
+            domains = {}
+            for category, source in SOURCES.items():
+                with open(source, encoding="utf-8") as f:
+                    domains[category] = f.read().splitlines()
+            build_index(domains)
+        _index = DomainIndex()
+    return _index.classify(domain)
@@ -0,0 +1,190 @@
+import json
+import time
+from collections import deque
+
+import zmq
+
+from core import metrics
+from core.pipeline import DEFAULT_STAGES, batches, process_batch
+
+WORK_ENDPOINT = "tcp://localhost:5557"
+RESULTS_ENDPOINT = "tcp://localhost:5558"
+ACK_ENDPOINT = "tcp://localhost:5559"
+
+# Coordinator: hands out batches over a ROUTER socket, each batch leased until
+# the sink confirms it was stored. A batch whose lease runs out (its worker
+# died or stalled) goes back to the front of the queue.
+# Worker: asks for a batch (REQ), runs the stages, pushes results to the sink.
+# Sink: pulls results, writes them to the outputs and acknowledges the batch
+# to the coordinator. A re-leased batch that arrives twice is stored once.
+# While no results come in, the sink asks the coordinator for its status, so
+# it also stops when there was nothing to hand out. The coordinator stays up
+# until the sink has been told it is finished.
+
+
+def _bind_address(endpoint):
+    return endpoint.replace("localhost", "*", 1)
+
+
+def run_coordinator(records, batch_size=50, lease_timeout=300.0, work=WORK_ENDPOINT, acks=ACK_ENDPOINT,
+                    linger=5.0):
+    # records: iterable of (username, domain), already parsed and deduplicated.
+    ctx = zmq.Context.instance()
+    router = ctx.socket(zmq.ROUTER)
+    router.bind(_bind_address(work))
+    ack = ctx.socket(zmq.REP)
+    ack.bind(_bind_address(acks))
+    poller = zmq.Poller()
+    poller.register(router, zmq.POLLIN)
+    poller.register(ack, zmq.POLLIN)
+
+    source = enumerate(batches((f"{u}@{d}" for u, d in records), batch_size))
+    requeued = deque()
+    leased = {}
+    completed = set()
+    stats = {"batches": 0, "released": 0}
+    exhausted = False
+    sink_told = False
+    finished_at = None
+
+    def next_batch():
+        nonlocal exhausted
+        while requeued:
+            batch = requeued.popleft()
+            if batch[0] not in completed:
+                return batch
+        if not exhausted:
+            try:
+                batch_id, emails = next(source)
+                stats["batches"] += 1
+                return batch_id, emails
+            except StopIteration:
+                exhausted = True
+        return None
+
+    try:
+        while finished_at is None or time.monotonic() - finished_at < linger:
+            events = dict(poller.poll(500))
+            if router in events:
+                identity, _, _ = router.recv_multipart()
+                batch = next_batch()
+                if batch is not None:
+                    batch_id, emails = batch
+                    leased[batch_id] = (time.monotonic() + lease_timeout, emails)
+                    reply = {"batch": batch_id, "emails": emails}
+                elif leased:
+                    reply = {"wait": 1.0}
+                else:
+                    reply = {"done": True}
+                router.send_multipart([identity, b"", json.dumps(reply).encode()])
+            if ack in events:
+                # {"batch": id} confirms a stored batch; {} only asks for the status.
+                batch_id = ack.recv_json().get("batch")
+                if batch_id is not None:
+                    leased.pop(batch_id, None)
+                    completed.add(batch_id)
+                    requeued = deque(b for b in requeued if b[0] != batch_id)
+                if not exhausted and not requeued and not leased:
+                    # Nothing out: take the next batch now (it is handed out
+                    # first), so an empty input is seen as finished.
+                    batch = next_batch()
+                    if batch is not None:
+                        requeued.appendleft(batch)
+                done = exhausted and not requeued and not leased
+                sink_told = sink_told or done
+                ack.send_json({"finished": done, "batches": stats["batches"]})
+
+            now = time.monotonic()
+            for batch_id, (deadline, emails) in list(leased.items()):
+                if deadline < now:
+                    del leased[batch_id]
+                    requeued.append((batch_id, emails))
+                    stats["released"] += 1
+                    metrics.inc("osint_retries_total", component="coordinator")
+            if finished_at is None and sink_told:
+                # Stay up a little to tell polling workers there is nothing left.
+                finished_at = time.monotonic()
+    finally:
+        router.close(0)
+        ack.close(0)
+    return stats
+
+
+def run_worker(work=WORK_ENDPOINT, results=RESULTS_ENDPOINT, skip_disposable=False, verifier=None,
+               stages=DEFAULT_STAGES, process=None, timeout=30.0, retries=3):
+    # process(emails) -> results; defaults to the full pipeline.
+    from core.email_utils import parse_emails
+
+    if process is None:
+        def process(emails):
+            return process_batch(parse_emails(emails), {}, skip_disposable, verifier, stages)
+
+    ctx = zmq.Context.instance()
+    out = ctx.socket(zmq.PUSH)
+    out.connect(results)
+    processed = 0
+    failures = 0
+    req = None
+    try:
+        while failures < retries:
+            if req is None:
+                req = ctx.socket(zmq.REQ)
+                req.setsockopt(zmq.LINGER, 0)
+                req.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+                req.connect(work)
+            req.send_json({"ready": True})
+            try:
+                msg = req.recv_json()
+            except zmq.Again:
+                # Coordinator gone or restarting: a REQ socket cannot resend,
+                # so start over with a fresh one.
+                req.close()
+                req = None
+                failures += 1
+                metrics.inc("osint_retries_total", component="worker")
+                continue
+            failures = 0
+            if msg.get("done"):
+                break
+            if "wait" in msg:
+                time.sleep(msg["wait"])
+                continue
+            out.send_json({"batch": msg["batch"], "results": process(msg["emails"])})
+            processed += 1
+    finally:
+        if req is not None:
+            req.close()
+        out.close()
+    return processed
+
+
+def run_sink(outputs, results=RESULTS_ENDPOINT, acks=ACK_ENDPOINT, on_result=None, poll=1.0):
+    ctx = zmq.Context.instance()
+    pull = ctx.socket(zmq.PULL)
+    pull.bind(_bind_address(results))
+    ack = ctx.socket(zmq.REQ)
+    ack.connect(acks)
+    poller = zmq.Poller()
+    poller.register(pull, zmq.POLLIN)
+    stored = set()
+    try:
+        while True:
+            if not poller.poll(poll * 1000):
+                ack.send_json({})
+            else:
+                msg = pull.recv_json()
+                if msg["batch"] not in stored:
+                    for result in msg["results"]:
+                        outputs.write(result)
+                        if on_result:
+                            on_result(result)
+                    outputs.flush()
+                    stored.add(msg["batch"])
+                ack.send_json({"batch": msg["batch"]})
+            # {"finished": true, "batches": n} once all n batches are stored
+            if ack.recv_json()["finished"]:
+                break
+    finally:
+        pull.close(0)
+        ack.close(0)
+    return len(stored)
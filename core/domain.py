@@ -1,8 +1,158 @@
-import dns.resolver
+import threading
+import time
 
-def domain_has_mx(domain):
+from core import metrics
+from core.psl import registered_domain
+
+MX_CACHE_SIZE = 100_000
+DNS_CACHE_SIZE = 100_000
+DNS_WORKERS = 32
+
+# When set, MX answers are looked up and cached per registered domain, so
+# mail.corp.example.co.uk and example.co.uk share one lookup, of
+# example.co.uk.
+group_by_registered_domain = False
+
+_mx_cache = {}
+_intel_cache = {}
+_cache_lock = threading.Lock()
+_MISSING = object()
+_resolver = None
+_pool = None
+
+
+def get_resolver():
+    # One resolver, and so one answer cache, shared by every lookup.
+    global _resolver
+    if _resolver is None:
+        import dns.resolver
+
+        _resolver = dns.resolver.Resolver()
+        _resolver.cache = dns.resolver.LRUCache(DNS_CACHE_SIZE)
+        _resolver.lifetime = 5.0
+    return _resolver
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        _pool = ThreadPoolExecutor(max_workers=DNS_WORKERS, thread_name_prefix="dns")
+    return _pool
+
+
+def _resolve(name, rdtype):
+    start = time.perf_counter()
     try:
-        dns.resolver.resolve(domain, "MX")
-        return True
-    except:
-        return False
+        answer = get_resolver().resolve(name, rdtype)
+        result = "ok"
+    except Exception as exc:
+        # NXDOMAIN, NoAnswer, LifetimeTimeout, ...
+        answer = None
+        result = type(exc).__name__
+    metrics.observe("osint_dns_query_seconds", time.perf_counter() - start, rdtype=rdtype)
+    metrics.inc("osint_dns_queries_total", rdtype=rdtype, result=result)
+    return answer
+
+
+def _query_mx(domain):
+    import dns.name
+
+    answer = _resolve(domain, "MX")
+    # A lone "0 ." record is a null MX: the domain accepts no mail.
+    return answer is not None and not (len(answer) == 1 and answer[0].exchange == dns.name.root)
+
+
+def cache_key(domain):
+    return registered_domain(domain) if group_by_registered_domain else domain
+
+
+def _cached(cache, name, key, compute):
+    # Lookups run on many threads: the value is computed outside the lock
+    # (two threads may both compute it, the first one stored wins) and
+    # returned from a local, so an eviction by another thread cannot take
+    # it away.
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        metrics.inc("osint_cache_requests_total", cache=name, result="hit")
+        return value
+    metrics.inc("osint_cache_requests_total", cache=name, result="miss")
+    value = compute()
+    with _cache_lock:
+        if key not in cache and len(cache) >= MX_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        return cache.setdefault(key, value)
+
+
+def domain_has_mx(domain):
+    key = cache_key(domain)
+    return _cached(_mx_cache, "mx", key, lambda: _query_mx(key))
+
+
+def _txt_record(answer, prefix):
+    for record in answer or ():
+        text = b"".join(record.strings).decode("utf-8", "replace")
+        if text.lower().startswith(prefix):
+            return text
+    return None
+
+
+def _glue(answer):
+    # MX responses usually carry the exchanges' addresses in the additional
+    # section, which saves a second round trip.
+    import dns.rdatatype
+
+    addresses = {}
+    for rrset in answer.response.additional:
+        if rrset.rdtype in (dns.rdatatype.A, dns.rdatatype.AAAA):
+            addresses.setdefault(rrset.name.to_text().rstrip(".").lower(), []).extend(r.address for r in rrset)
+    return addresses
+
+
+def _domain_intel(domain):
+    pool = _get_pool()
+    mx_future = pool.submit(_resolve, domain, "MX")
+    spf_future = pool.submit(_resolve, domain, "TXT")
+    dmarc_future = pool.submit(_resolve, "_dmarc." + domain, "TXT")
+
+    mx = mx_future.result()
+    records = sorted((r.preference, r.exchange.to_text().rstrip(".").lower()) for r in mx) if mx else []
+    null_mx = len(records) == 1 and records[0][1] == ""
+    if null_mx:
+        records = []
+
+    addresses = _glue(mx) if mx else {}
+    pending = {host: (pool.submit(_resolve, host, "A"), pool.submit(_resolve, host, "AAAA"))
+               for _, host in records if host not in addresses}
+    for host, futures in pending.items():
+        addresses[host] = [r.address for future in futures for r in (future.result() or ())]
+
+    return {
+        "has_mx": bool(records),
+        "null_mx": null_mx,
+        "mx": [{"host": host, "priority": priority, "addresses": addresses.get(host, [])}
+               for priority, host in records],
+        "spf": _txt_record(spf_future.result(), "v=spf1"),
+        "dmarc": _txt_record(dmarc_future.result(), "v=dmarc1"),
+    }
+
+
+def domain_intel(domain):
+    # MX (with priorities and addresses), SPF, DMARC and null-MX for a domain.
+    # The independent queries go out together, so a domain costs about one
+    # round trip instead of one per record type.
+    key = cache_key(domain)
+    return _cached(_intel_cache, "domain_intel", key, lambda: _domain_intel(key))
+
+
+def _collect():
+    # Hits and misses of dnspython's own answer cache.
+    if _resolver is None:
+        return []
+    stats = _resolver.cache.get_statistics_snapshot()
+    return [("osint_cache_requests_total", {"cache": "dns", "result": "hit"}, stats.hits),
+            ("osint_cache_requests_total", {"cache": "dns", "result": "miss"}, stats.misses)]
+
+
+metrics.register_collector(_collect)
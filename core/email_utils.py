@@ -1,8 +1,131 @@
+import os
+import re
+from functools import lru_cache
+
+_ATOM = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]++"
+_LABEL = r"(?!-)[\w-]{1,63}+(?<!-)"
+
+# One match per line validates and splits the address: a dot-atom or quoted
+# local part, exactly one "@", and a domain of two or more labels. Possessive
+# quantifiers keep the match linear, with no backtracking on bad input.
+_EMAIL = re.compile(
+    rf'\s*+(?:({_ATOM}(?:\.{_ATOM})*+)|"((?:[^"\\\r\n]|\\.)++)")@({_LABEL}(?:\.{_LABEL})++)\.?\s*+'
+)
+_QUOTED_PAIR = re.compile(r"\\(.)")
+_DOT_ATOM = re.compile(rf"{_ATOM}(?:\.{_ATOM})*+")
+_QUOTE_SPECIALS = re.compile(r'(["\\])')
+
+# Byte-level variant for whole blocks of a file: plain ASCII addresses, one per
+# line, with the length and numeric-TLD rules folded into lookaheads. Blocks
+# with anything it does not match fall back to parse_email line by line.
+_ASCII_LABEL = rb"(?!-)[A-Za-z0-9_-]{1,63}+(?<!-)"
+_ASCII_EMAIL = re.compile(
+    rb"^[ \t]*+(?=[^@\n]{1,64}+@)(" + _ATOM.encode() + rb"(?:\." + _ATOM.encode() + rb")*+)@"
+    rb"(?=[A-Za-z0-9_.-]{1,253}+[ \t\r]*+$)((?:" + _ASCII_LABEL + rb"\.)++(?![0-9]++[ \t\r]*+$)" + _ASCII_LABEL + rb")"
+    rb"[ \t\r]*+$",
+    re.M,
+)
+
+
+@lru_cache(maxsize=65536)
+def _encode_domain(domain):
+    return domain.encode("idna").decode("ascii").lower()
+
+
+def _local_part(quoted):
+    # A quoted local part in the shortest form that is still the same
+    # address: bare when its content is a dot-atom ("john"@x is john@x),
+    # otherwise kept in quotes, so f"{username}@{domain}" parses back to it.
+    local = _QUOTED_PAIR.sub(r"\1", quoted)
+    if _DOT_ATOM.fullmatch(local):
+        return local
+    return '"' + _QUOTE_SPECIALS.sub(r"\\\1", local) + '"'
+
+
+def is_quoted(username):
+    # Local parts that only exist in quotes (spaces, "@", ...) are no site
+    # username; the username probes skip them.
+    return username.startswith('"')
+
+
+def _valid(username, domain):
+    return len(username) <= 64 and len(domain) <= 253 and not domain.rsplit(".", 1)[1].isdigit()
+
+
+def parse_email(line):
+    m = _EMAIL.fullmatch(line)
+    if m is None:
+        return None
+    username, quoted, domain = m.groups()
+    if username is None:
+        username = _local_part(quoted)
+    if domain.isascii():
+        domain = domain.lower()
+    else:
+        try:
+            domain = _encode_domain(domain)
+        except UnicodeError:
+            return None
+    return (username, domain) if _valid(username, domain) else None
+
+
+def _read_blocks(f, size=1 << 20):
+    rest = b""
+    for chunk in iter(lambda: f.read(size), b""):
+        chunk = rest + chunk
+        cut = chunk.rfind(b"\n") + 1
+        rest = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+    if rest:
+        yield rest + b"\n"
+
+
+def parse_emails(source, stats=None):
+    # source is an iterable of raw lines or the path of a file with one email per line.
+    if stats is None:
+        stats = {}
+    stats.setdefault("parsed", 0)
+    stats.setdefault("rejected", 0)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _parse_blocks(_read_blocks(f), stats)
+        return
+
+    parsed = rejected = 0
+    try:
+        for line in source:
+            record = parse_email(line)
+            if record is not None:
+                parsed += 1
+                yield record
+            elif line.strip():
+                rejected += 1
+    finally:
+        stats["parsed"] += parsed
+        stats["rejected"] += rejected
+
+
+def _parse_blocks(blocks, stats):
+    findall = _ASCII_EMAIL.findall
+    for block in blocks:
+        records = findall(block)
+        if len(records) == block.count(b"\n"):
+            stats["parsed"] += len(records)
+            yield from [(u.decode(), d.lower().decode()) for u, d in records]
+        else:
+            yield from parse_emails(block.decode("utf-8", "replace").splitlines(), stats)
+
+
 def extract_username(email):
-    return email.split("@")[0]
+    record = parse_email(email)
+    if record is None:
+        raise ValueError(f"malformed email address: {email!r}")
+    return record[0]
 
 
 def extract_domain(email):
-    return email.split("@")[1]
-
- 
\ No newline at end of file
+    record = parse_email(email)
+    if record is None:
+        raise ValueError(f"malformed email address: {email!r}")
+    return record[1]
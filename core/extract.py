@@ -0,0 +1,152 @@
+import json
+import re
+from html import unescape
+
+# Pulls a few profile fields out of a page without building a document tree.
+# Only the tags that can carry them are tokenized: <meta> (og:, twitter:,
+# description), JSON-LD <script> blocks, plus <script>, <style> and comments,
+# which are skipped whole so markup inside them is never mistaken for a tag.
+# Scanning stops as soon as every requested field has a value, or at <body>
+# when no field comes from JSON-LD.
+#
+# A site declares its fields as {field: (source, ...)}, sources tried in order:
+#   "meta:og:title"                      content of <meta property|name="og:title">
+#   ("meta:og:description", r"(\S+) Followers")   first group of a regex on it
+#   "ld:name", "ld:description", "ld:followers", "ld:links", "ld:image"
+#                                        from the Person in a JSON-LD block
+
+_TAG = re.compile(rb"<(?:(meta)\b([^>]*)>|(script)\b([^>]*)>|(style)\b[^>]*>|(!--)|(body)\b)", re.I)
+_ATTR = re.compile(rb"""([a-zA-Z_:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+_LD_TYPE = re.compile(rb"""type\s*=\s*["']?application/ld\+json""", re.I)
+_CLOSE = {b"script": re.compile(rb"</script\s*>", re.I), b"style": re.compile(rb"</style\s*>", re.I)}
+_COUNT = re.compile(r"([\d][\d,.]*)\s*([KkMmBb]?)")
+_DOT_THOUSANDS = re.compile(r"\d{1,3}(?:\.\d{3})+")
+_SCALE = {"": 1, "k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+
+def _attrs(raw):
+    attrs = {}
+    for match in _ATTR.finditer(raw):
+        value = match.group(2) if match.group(2) is not None else match.group(3) or match.group(4) or b""
+        attrs[match.group(1).lower().decode("ascii")] = value
+    return attrs
+
+
+def _text(value):
+    return unescape(value.decode("utf-8", "replace")).strip()
+
+
+def count(value):
+    # "12,345" -> 12345, "1.2M" -> 1200000, "1.234" -> 1234, "1.5" -> 1
+    if isinstance(value, int):
+        return value
+    match = _COUNT.search(str(value))
+    if not match:
+        return None
+    number, suffix = match.groups()
+    number = number.replace(",", "")
+    if not suffix and _DOT_THOUSANDS.fullmatch(number):
+        # counts are whole numbers: dots before groups of three separate thousands
+        number = number.replace(".", "")
+    try:
+        return int(float(number) * _SCALE[suffix.lower()])
+    except ValueError:
+        return None
+
+
+def _people(node):
+    # Person-like entities in a JSON-LD document (ProfilePage.mainEntity, @graph, lists).
+    if isinstance(node, list):
+        for item in node:
+            yield from _people(item)
+    elif isinstance(node, dict):
+        types = node.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if "Person" in types or "Organization" in types:
+            yield node
+        for key in ("mainEntity", "@graph", "author"):
+            if key in node:
+                yield from _people(node[key])
+
+
+def _ld_value(person, key):
+    if key == "followers":
+        for stat in person.get("interactionStatistic") or ():
+            if isinstance(stat, dict) and "Follow" in str(stat.get("interactionType", "")):
+                return count(stat.get("userInteractionCount"))
+        return None
+    if key == "links":
+        links = person.get("sameAs") or []
+        return [links] if isinstance(links, str) else list(links) or None
+    if key == "image":
+        image = person.get("image")
+        return image.get("url") if isinstance(image, dict) else image
+    return person.get(key)
+
+
+def _resolve(spec, fields, final, meta, people, closed):
+    # A value is final once every source listed before the one that gave it
+    # is known to be empty (its kind is closed: meta after <head>).
+    for field, sources in spec.items():
+        if field in final:
+            continue
+        settled = True
+        for source in sources:
+            source, pattern = source if isinstance(source, tuple) else (source, None)
+            kind, _, key = source.partition(":")
+            if kind == "meta":
+                value = meta.get(key)
+            else:
+                value = next((v for v in (_ld_value(p, key) for p in people) if v), None)
+            if value and pattern:
+                match = re.search(pattern, value)
+                value = match.group(1) if match else None
+            if value:
+                fields[field] = count(value) if field == "followers" else value
+                if settled:
+                    final.add(field)
+                break
+            if kind not in closed:
+                settled = False
+
+
+def extract(data, spec):
+    # data: page bytes; spec: {field: sources}. Returns the fields found.
+    wanted = {source[0] if isinstance(source, tuple) else source for sources in spec.values() for source in sources}
+    wanted_meta = {source[5:] for source in wanted if source.startswith("meta:")}
+    wants_ld = any(source.startswith("ld:") for source in wanted)
+    fields, final, meta, people, closed = {}, set(), {}, [], set()
+    pos = 0
+    while len(final) < len(spec):
+        match = _TAG.search(data, pos)
+        if match is None:
+            break
+        pos = match.end()
+        if match.group(1):
+            attrs = _attrs(match.group(2))
+            key = attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or b""
+            key = key.decode("ascii", "replace")
+            if key in wanted_meta and key not in meta and "content" in attrs:
+                meta[key] = _text(attrs["content"])
+                _resolve(spec, fields, final, meta, people, closed)
+        elif match.group(7):
+            # meta tags live in <head>
+            closed.add("meta")
+            if not wants_ld:
+                break
+            _resolve(spec, fields, final, meta, people, closed)
+        elif match.group(6):
+            end = data.find(b"-->", pos)
+            pos = len(data) if end < 0 else end + 3
+        else:
+            tag = (match.group(3) or match.group(5)).lower()
+            close = _CLOSE[tag].search(data, pos)
+            end = close.start() if close else len(data)
+            if wants_ld and tag == b"script" and _LD_TYPE.search(match.group(4)):
+                try:
+                    people.extend(_people(json.loads(data[pos:end])))
+                    _resolve(spec, fields, final, meta, people, closed)
+                except ValueError:
+                    pass
+            pos = close.end() if close else len(data)
+    return fields
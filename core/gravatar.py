@@ -1,8 +1,11 @@
 import hashlib
-import requests
+from core.http import get_session
 
-def gravatar_lookup(email):
+def avatar_url(email):
     h = hashlib.md5(email.strip().lower().encode()).hexdigest()
-    url = f"https://www.gravatar.com/avatar/{h}?d=404"
-    r = requests.get(url)
+    return f"https://www.gravatar.com/avatar/{h}?d=404"
+
+def gravatar_lookup(email):
+    url = avatar_url(email)
+    r = get_session().get(url)
     return url if r.status_code == 200 else None
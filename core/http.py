@@ -0,0 +1,165 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from core import metrics, tracing
+
+POOL_SIZE = 64
+# Requests in flight at once across every stage (probes, profiles, searches).
+MAX_IN_FLIGHT = POOL_SIZE
+# Requests per second allowed to a host; hosts not listed are not throttled.
+RATE_LIMITS = {}
+
+_session = None
+_in_flight = None
+_rates = {}
+_rates_lock = threading.Lock()
+_local = threading.local()
+
+
+class _HostRate:
+    # Hands out evenly spaced start times; a thread sleeps until its own.
+    __slots__ = ("interval", "next", "lock")
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second
+        self.next = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next)
+            self.next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return start - now
+
+
+def _host_rate(host):
+    rate = _rates.get(host)
+    if rate is None and host in RATE_LIMITS:
+        with _rates_lock:
+            rate = _rates.get(host)
+            if rate is None:
+                rate = _rates[host] = _HostRate(RATE_LIMITS[host])
+    return rate
+
+
+def set_rate_limit(host, per_second):
+    with _rates_lock:
+        RATE_LIMITS[host] = per_second
+        _rates.pop(host, None)
+
+
+def _throttle(session):
+    # Every request through the shared session waits for its host's rate
+    # limit and then for one of MAX_IN_FLIGHT slots, so all stages share one
+    # schedule. Waiting is outside the timed request. requests follows a
+    # redirect by calling send again from inside the first call: that hop
+    # waits for its own host's rate but keeps the slot it already holds.
+    send = session.send
+
+    def throttled_send(request, **kwargs):
+        site = urlsplit(request.url).hostname or ""
+        rate = _host_rate(site)
+        if rate is not None:
+            metrics.observe("osint_http_throttle_seconds", rate.wait(), site=site)
+        if getattr(_local, "sending", False):
+            return send(request, **kwargs)
+        _local.sending = True
+        try:
+            with _in_flight:
+                return send(request, **kwargs)
+        finally:
+            _local.sending = False
+
+    session.send = throttled_send
+    return session
+
+
+def _instrument(session):
+    # Times and counts every request at the transport level, redirect hops
+    # included, labelled by host.
+    send = session.send
+
+    def timed_send(request, **kwargs):
+        site = urlsplit(request.url).hostname or ""
+        sent = len(request.method) + len(request.path_url)
+        sent += sum(len(key) + len(value) + 4 for key, value in request.headers.items())
+        body = request.body
+        if body:
+            sent += len(body) if isinstance(body, (bytes, str)) else int(request.headers.get("Content-Length", 0))
+        metrics.inc("osint_http_sent_bytes_total", sent, site=site)
+        with tracing.span("http", site=site) as span:
+            start = time.perf_counter()
+            try:
+                response = send(request, **kwargs)
+            except Exception as exc:
+                metrics.inc("osint_http_requests_total", site=site, status=type(exc).__name__)
+                raise
+            finally:
+                metrics.observe("osint_http_request_seconds", time.perf_counter() - start, site=site)
+            span.set(status=response.status_code)
+        metrics.inc("osint_http_requests_total", site=site, status=str(response.status_code))
+        if kwargs.get("stream"):
+            received = int(response.headers.get("Content-Length", 0))
+        else:
+            received = len(response.content)
+        metrics.inc("osint_http_received_bytes_total", received, site=site)
+        return response
+
+    session.send = timed_send
+    return session
+
+
+def get_session():
+    # One session for every probe, so keep-alive connections are reused
+    # across emails instead of reconnecting for each request.
+    global _session, _in_flight
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _instrument(_session)
+        _in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+        _throttle(_session)
+    return _session
+
+
+def probe_sites(sites, username, soft_404=None, pages=None):
+    # sites: {name: profile URL template}. A 200 counts as found, except on
+    # sites listed in soft_404 ({name: "not found" title markers}), whose
+    # pages are checked off-thread while the remaining sites are probed.
+    # pages, when given, receives the body of each found profile page, so
+    # the profile extraction does not fetch it again.
+    from core.pages import check_page
+
+    soft_404 = soft_404 or {}
+    found = {}
+    for name, template in sites.items():
+        url = template.format(username)
+        try:
+            r = get_session().get(url, timeout=5)
+        except Exception:
+            continue
+        if r.status_code != 200:
+            continue
+        found[name] = (url, check_page(r.content, soft_404[name]) if name in soft_404 else None, r.content)
+
+    results = {}
+    for name, (url, verdict, body) in found.items():
+        try:
+            exists = verdict is None or verdict.result()
+        except Exception:
+            # page could not be checked: fall back to the status code
+            exists = True
+        if exists:
+            results[name] = url
+            if pages is not None:
+                pages[name] = body
+    return results
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from storage.jsonl import ROOT
+
+METRICS_PATH = os.path.join(ROOT, "output", "metrics.prom")
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    "osint_stage_seconds": ("histogram", "Time spent in each per-email pipeline stage per email"),
+    "osint_batch_stage_seconds": ("histogram", "Time spent in each batch stage (smtp, dorks, search) per batch"),
+    "osint_emails_total": ("counter", "Emails by outcome"),
+    "osint_http_request_seconds": ("histogram", "HTTP request latency by site"),
+    "osint_http_requests_total": ("counter", "HTTP requests by site and status"),
+    "osint_http_throttle_seconds": ("histogram", "Time requests waited for their host's rate limit"),
+    "osint_http_sent_bytes_total": ("counter", "Request bytes sent by site (headers and body)"),
+    "osint_http_received_bytes_total": ("counter", "Response body bytes received by site"),
+    "osint_dns_query_seconds": ("histogram", "DNS query latency by record type"),
+    "osint_dns_queries_total": ("counter", "DNS queries by record type and result"),
+    "osint_cache_requests_total": ("counter", "Cache lookups by cache and result"),
+    "osint_smtp_sessions_total": ("counter", "SMTP sessions opened"),
+    "osint_smtp_checks_total": ("counter", "SMTP mailbox checks by status"),
+    "osint_retries_total": ("counter", "Retried work by component"),
+    "osint_schema_checks_total": ("counter", "Results checked against the result schema"),
+    "osint_schema_violations_total": ("counter", "Results that did not match the result schema by rule"),
+}
+
+
+class Registry:
+    # Every thread updates its own shard without locking; a scrape sums the
+    # shards. When a thread ends, its shard is folded into the retired totals
+    # so counters never go back and the shards do not pile up.
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = {}
+        self._retired = {}
+        self._collectors = []
+
+    def _shard(self):
+        try:
+            return self._local.owner.shard
+        except AttributeError:
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(owner.shard)] = owner.shard
+            # The thread-local owner goes away with its thread.
+            weakref.finalize(owner, self._retire, owner.shard)
+            return owner.shard
+
+    def _retire(self, shard):
+        with self._lock:
+            if self._shards.pop(id(shard), None) is not None:
+                _merge(self._retired, shard)
+
+    def inc(self, name, amount=1, **labels):
+        shard = self._shard()
+        key = (name, tuple(labels.items()))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        shard = self._shard()
+        key = (name, tuple(labels.items()))
+        counts = shard.get(key)
+        if counts is None:
+            # one slot per bucket, then +Inf, then the sum
+            counts = shard[key] = [0] * (len(BUCKETS) + 2)
+        counts[bisect_left(BUCKETS, seconds)] += 1
+        counts[-1] += seconds
+
+    def timer(self, name, **labels):
+        return _Timer(self, name, labels)
+
+    def register_collector(self, collect):
+        # collect() -> iterable of (name, labels, value), read at scrape time.
+        self._collectors.append(collect)
+
+    def samples(self):
+        with self._lock:
+            shards = [dict(shard) for shard in self._shards.values()]
+            totals = {key: list(value) if isinstance(value, list) else value
+                      for key, value in self._retired.items()}
+        for shard in shards:
+            _merge(totals, shard)
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                key = (name, tuple(labels.items()))
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self):
+        # Prometheus text exposition format, version 0.0.4.
+        by_name = {}
+        for (name, labels), value in self.samples().items():
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = METRICS.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name], key=lambda sample: sample[0]):
+                if kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), value):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value[-1]!r}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=METRICS_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        # Scrapers reading the file (node_exporter textfile) never see half of it.
+        os.replace(tmp, path)
+
+
+class _ShardOwner:
+    # Holds a thread's shard in the thread-local, so the shard can be retired
+    # by a finalizer when the thread ends (a plain dict takes no weakref).
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self):
+        self.shard = {}
+
+
+def _merge(totals, shard):
+    for key, value in shard.items():
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            for i, v in enumerate(list(value)):
+                current[i] += v
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def lru_collector(name, cached):
+    # Reports the hits and misses of a functools.lru_cache-wrapped function.
+    def collect():
+        info = cached.cache_info()
+        return [("osint_cache_requests_total", {"cache": name, "result": "hit"}, info.hits),
+                ("osint_cache_requests_total", {"cache": name, "result": "miss"}, info.misses)]
+    REGISTRY.register_collector(collect)
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+register_collector = REGISTRY.register_collector
+render = REGISTRY.render
+write = REGISTRY.write
@@ -0,0 +1,96 @@
+import os
+import threading
+
+HEAD_LIMIT = 64 * 1024
+PROFILE_LIMIT = 1024 * 1024
+WORKERS = os.cpu_count() or 1
+QUEUE_PER_WORKER = 8
+
+# Page checks (is this 200 a real profile or a "page not found" page?) parse
+# HTML, which is CPU work that would hold the GIL and stall every other probe
+# thread. They run in a process pool instead: probes send only the <head> of
+# the page and get a bool back. Profile extraction (core.extract) runs there
+# too and returns a few fields. With WORKERS = 0 pages are parsed in the
+# calling thread.
+
+_pool = None
+_slots = None
+_lock = threading.Lock()
+
+
+def head_slice(content, limit=HEAD_LIMIT):
+    # Title and meta tags live in <head>; the body of a 500 KB profile page
+    # never needs to cross the process boundary.
+    end = content.find(b"</head>", 0, limit)
+    return content[:end + 7] if end >= 0 else content[:limit]
+
+
+def page_exists(data, markers):
+    # Runs in a worker process. A page whose title contains one of the
+    # markers is a soft 404.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(data, "html.parser")
+    title = soup.title.get_text() if soup.title else ""
+    return not any(marker in title for marker in markers)
+
+
+def _get_pool():
+    global _pool, _slots
+    with _lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a process that already runs DNS and HTTP threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _slots = threading.BoundedSemaphore(WORKERS * QUEUE_PER_WORKER)
+    return _pool
+
+
+class _Done:
+    # Future-like result for pages checked in the calling thread.
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def submit(fn, *args):
+    # Runs fn(*args) in the pool and returns a future. Blocks when the pool's
+    # queue is full, so probes cannot pile up pages faster than the workers
+    # parse them.
+    if not WORKERS:
+        return _Done(fn(*args))
+    pool = _get_pool()
+    _slots.acquire()
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def check_page(content, markers):
+    # Returns a future whose result() says whether the page is a real profile.
+    return submit(page_exists, head_slice(content), markers)
+
+
+def extract_profile(content, spec):
+    # Returns a future for the profile fields of a page (see core.extract).
+    from core.extract import extract
+
+    return submit(extract, content[:PROFILE_LIMIT], spec)
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,132 @@
+from core import metrics, profiling, tracing
+from core.classify import classify_domain
+from core.domain import domain_intel
+from core.email_utils import is_quoted
+from core.gravatar import gravatar_lookup
+from dorks.google_dorks import get_dorks
+from dorks.search import search_dorks
+from modules.dev_plateforms import find_dev_accounts
+from modules.forums import find_forum_accounts
+from modules.profiles import extract_profiles
+from modules.social_accounts import find_social_accounts
+
+STAGES = ("classify", "dns", "gravatar", "social", "forums", "dev", "profiles", "dorks", "search")
+DEFAULT_STAGES = ("classify", "dns", "gravatar", "social")
+BATCH_METRIC = "osint_batch_stage_seconds"
+
+
+class _Stage:
+    # Metrics, a trace span and (with --profile) a profiler around one stage.
+    # Stages that run once per batch are timed in their own histogram.
+    __slots__ = ("hooks",)
+
+    def __init__(self, name, metric="osint_stage_seconds"):
+        self.hooks = (metrics.timer(metric, stage=name), tracing.span(name), profiling.stage(name))
+
+    def __enter__(self):
+        for hook in self.hooks:
+            hook.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        for hook in reversed(self.hooks):
+            hook.__exit__(*exc)
+
+
+def lookup(username, domain, stages=DEFAULT_STAGES):
+    # Every result has the same keys; a stage that did not run leaves its
+    # fields empty.
+    email = f"{username}@{domain}"
+    result = {
+        "email": email,
+        "username": username,
+        "domain": domain,
+        "domain_type": None,
+        "mx": None,
+        "dns": None,
+        "gravatar": None,
+        "accounts": {},
+        "profiles": {},
+        "dorks": {},
+        "search": {},
+    }
+    # A quoted local part ("john doe"@x) is a mailbox but no site username.
+    probe = not is_quoted(username)
+    # Bodies of the found profile pages, kept for the profiles stage.
+    pages = {} if "profiles" in stages else None
+    with tracing.trace("email", email=email):
+        if "classify" in stages:
+            with _Stage("classify"):
+                result["domain_type"] = classify_domain(domain)
+        if "dns" in stages:
+            with _Stage("dns"):
+                intel = domain_intel(domain)
+            result["mx"] = intel["has_mx"]
+            result["dns"] = intel
+        if "gravatar" in stages:
+            with _Stage("gravatar"):
+                result["gravatar"] = gravatar_lookup(email)
+        if "social" in stages and probe:
+            with _Stage("social"):
+                result["accounts"].update(find_social_accounts(username, pages))
+        if "forums" in stages and probe:
+            with _Stage("forums"):
+                result["accounts"].update(find_forum_accounts(username, pages))
+        if "dev" in stages and probe:
+            with _Stage("dev"):
+                result["accounts"].update(find_dev_accounts(username, pages))
+        if "profiles" in stages:
+            # display name, bio, followers and links of the accounts found above
+            with _Stage("profiles"):
+                result["profiles"] = extract_profiles(result["accounts"], pages)
+    return result
+
+
+def check_mailboxes(results, verifier):
+    # One verify() call per batch, so addresses sharing an MX host share a session.
+    with tracing.trace("smtp", batch=len(results)), _Stage("smtp", BATCH_METRIC):
+        statuses = verifier.verify((r["email"], r["domain"], [mx["host"] for mx in r["dns"]["mx"]])
+                                   for r in results if r["mx"])
+    for result in results:
+        result["smtp"] = statuses.get(result["email"])
+
+
+def add_dorks(results):
+    # Search URLs for the whole batch at once; username and domain dorks are
+    # attached to the first result of the run with that username or domain.
+    with _Stage("dorks", BATCH_METRIC):
+        dorks = get_dorks().batch((r["username"], r["domain"]) for r in results)
+    for result, generated in zip(results, dorks):
+        result["dorks"] = generated
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process_batch(records, stats, skip_disposable=False, verifier=None, stages=DEFAULT_STAGES):
+    # Runs every network stage for a batch of (username, domain) records.
+    results = []
+    for username, domain in records:
+        if skip_disposable and classify_domain(domain) == "disposable":
+            stats["disposable"] = stats.get("disposable", 0) + 1
+            metrics.inc("osint_emails_total", outcome="disposable")
+            continue
+        results.append(lookup(username, domain, stages))
+        metrics.inc("osint_emails_total", outcome="processed")
+    if verifier:
+        check_mailboxes(results, verifier)
+    if "dorks" in stages:
+        add_dorks(results)
+    if "search" in stages:
+        # result links of every dork above, shared between equal queries
+        with _Stage("search", BATCH_METRIC):
+            search_dorks(results)
+    return results
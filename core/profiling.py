@@ -0,0 +1,171 @@
+import os
+import threading
+from collections import Counter
+
+from storage.jsonl import ROOT
+
+PROFILE_DIR = os.path.join(ROOT, "output", "profile")
+SNAPSHOT_EVERY = 1000
+TOP_ALLOCATIONS = 25
+
+# With --profile every stage runs under its own cProfile profiler and its
+# allocations are tracked with tracemalloc: net and peak bytes on every call,
+# plus a snapshot diff (allocation sites) on the second call and one call in
+# SNAPSHOT_EVERY after that (snapshots cost time in proportion to the live
+# heap; the first call is usually one-off warm-up like loading an index).
+# Only the thread that started profiling is profiled, so work a stage hands
+# to a pool (DNS sub-queries) shows up as time spent waiting.
+
+_profiler = None
+
+
+class _StageStats:
+    def __init__(self, profile):
+        self.profile = profile
+        self.calls = 0
+        self.net = 0
+        self.peak = 0
+        self.snapshots = 0
+        self.allocations = Counter()
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR, snapshot_every=SNAPSHOT_EVERY):
+        import cProfile
+        import tracemalloc
+
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.stages = {}
+        self._new_profile = cProfile.Profile
+        self._tracemalloc = tracemalloc
+        self._thread = threading.get_ident()
+        self._stack = []
+        tracemalloc.start()
+
+    def stage(self, name):
+        if threading.get_ident() != self._thread:
+            return _NO_STAGE
+        return _Stage(self, name)
+
+    def write(self):
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        rows = []
+        for name, stats in sorted(self.stages.items()):
+            stats.profile.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+            with open(os.path.join(self.directory, f"{name}.alloc.txt"), "w") as f:
+                f.write(f"{name}: {stats.calls} call(s), {stats.snapshots} snapshot(s), "
+                        f"net {stats.net / 1024:.1f} KiB, peak {stats.peak / 1024:.1f} KiB\n")
+                f.write("top allocation sites over the snapshot calls (bytes still allocated at stage exit):\n")
+                for site, size in stats.allocations.most_common(TOP_ALLOCATIONS):
+                    f.write(f"{size:>12,}  {site}\n")
+            rows.append((name, stats.calls, pstats.Stats(stats.profile).total_tt, stats.net, stats.peak))
+
+        with open(os.path.join(self.directory, "summary.txt"), "w") as f:
+            f.write(f"{'stage':<12} {'calls':>8} {'time (s)':>10} {'net KiB':>10} {'peak KiB':>10}\n")
+            for name, calls, seconds, net, peak in rows:
+                f.write(f"{name:<12} {calls:>8} {seconds:>10.3f} {net / 1024:>10.1f} {peak / 1024:>10.1f}\n")
+        self._tracemalloc.stop()
+        return os.path.join(self.directory, "summary.txt")
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "stats", "snapshot", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        stats = profiler.stages.get(self.name)
+        if stats is None:
+            stats = profiler.stages[self.name] = _StageStats(profiler._new_profile())
+        stats.calls += 1
+        self.stats = stats
+        # one profiler can be active per thread: pause the enclosing stage
+        if profiler._stack:
+            profiler._stack[-1].profile.disable()
+        profiler._stack.append(stats)
+
+        tracemalloc = profiler._tracemalloc
+        sampled = (stats.calls - 2) % profiler.snapshot_every == 0
+        self.snapshot = tracemalloc.take_snapshot() if sampled else None
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+        stats.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        stats = self.stats
+        stats.profile.disable()
+        profiler = self.profiler
+        tracemalloc = profiler._tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        stats.net += current - self.start
+        stats.peak = max(stats.peak, peak - self.start)
+        if self.snapshot is not None:
+            for stat in tracemalloc.take_snapshot().compare_to(self.snapshot, "lineno"):
+                frame = stat.traceback[0]
+                if stat.size_diff > 0 and frame.filename not in (tracemalloc.__file__, __file__):
+                    stats.allocations[str(frame)] += stat.size_diff
+            stats.snapshots += 1
+
+        profiler._stack.pop()
+        if profiler._stack:
+            profiler._stack[-1].profile.enable()
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    profiler = _profiler
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.stage(name)
+
+
+def iterate(name, iterable):
+    # Profiles the work done producing each item of a lazy iterable
+    # (parsing and deduplication run this way).
+    if _profiler is None:
+        return iterable
+    return _iterate(name, iter(iterable))
+
+
+def _iterate(name, iterator):
+    while True:
+        with stage(name):
+            item = next(iterator, _NO_STAGE)
+        if item is _NO_STAGE:
+            return
+        yield item
+
+
+def start(directory=PROFILE_DIR, snapshot_every=SNAPSHOT_EVERY):
+    global _profiler
+    _profiler = Profiler(directory, snapshot_every)
+    return _profiler
+
+
+def stop():
+    # Writes the .prof files and allocation summaries; returns the summary path.
+    global _profiler
+    if _profiler is None:
+        return None
+    path = _profiler.write()
+    _profiler = None
+    return path
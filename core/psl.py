@@ -0,0 +1,85 @@
+import marshal
+import os
+from functools import lru_cache
+
+from core import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PSL_PATH = os.path.join(ROOT, "data", "public_suffix_list.dat")
+TRIE_PATH = os.path.join(ROOT, "data", "psl.trie")
+
+# The trie is nested dicts keyed by label from the TLD inwards. "" marks the
+# end of a rule, "*" a wildcard label and "!label" an exception. It is written
+# with marshal, which loads the whole snapshot in a few milliseconds.
+_trie = None
+
+
+def compile_trie(source=PSL_PATH, path=TRIE_PATH):
+    trie = {}
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            rule = line.strip()
+            if not rule or rule.startswith("//"):
+                continue
+            try:
+                rule = rule.encode("idna").decode("ascii")
+            except UnicodeError:
+                continue
+            node = trie
+            for label in reversed(rule.lower().split(".")):
+                node = node.setdefault(label, {})
+            node[""] = True
+    with open(path + ".tmp", "wb") as f:
+        marshal.dump(trie, f)
+    os.replace(path + ".tmp", path)
+    return trie
+
+
+def _load():
+    global _trie
+    if _trie is None:
+        if not os.path.exists(TRIE_PATH) or os.path.getmtime(TRIE_PATH) < os.path.getmtime(PSL_PATH):
+            _trie = compile_trie()
+        else:
+            with open(TRIE_PATH, "rb") as f:
+                _trie = marshal.load(f)
+    return _trie
+
+
+def _suffix_length(labels):
+    # labels run from the TLD inwards. Without a matching rule the TLD alone
+    # is the public suffix (the implicit "*" rule).
+    node = _load()
+    length = 1
+    for depth, label in enumerate(labels):
+        if "!" + label in node:
+            return depth
+        wildcard = node.get("*")
+        if wildcard is not None and "" in wildcard:
+            length = depth + 1
+        node = node.get(label)
+        if node is None:
+            break
+        if "" in node:
+            length = depth + 1
+    return length
+
+
+@lru_cache(maxsize=65536)
+def public_suffix(domain):
+    labels = domain.lower().rstrip(".").split(".")[::-1]
+    return ".".join(labels[:_suffix_length(labels)][::-1])
+
+
+@lru_cache(maxsize=65536)
+def registered_domain(domain):
+    # mail.corp.example.co.uk -> example.co.uk. A domain that is itself a
+    # public suffix is returned unchanged.
+    labels = domain.lower().rstrip(".").split(".")[::-1]
+    length = _suffix_length(labels)
+    if len(labels) <= length:
+        return ".".join(labels[::-1])
+    return ".".join(labels[:length + 1][::-1])
+
+
+metrics.lru_collector("registered_domain", registered_domain)
@@ -0,0 +1,124 @@
+import os
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(ROOT, "reports", "report.txt")
+
+# Rendered for a whole batch of results at a time, which keeps the
+# per-render setup cost out of the per-email path.
+EMAIL_TEMPLATE = """\
+{% for r in results %}
+EMAIL: {{ r.email }}
+USERNAME: {{ r.username }}
+DOMAIN TYPE: {{ r.domain_type or "unknown" }}
+{% if r.mx is not none %}
+DOMAIN ACTIVE: {{ r.mx }}
+{% endif %}
+GRAVATAR: {{ r.gravatar or "None" }}
+FOUND SOCIAL ACCOUNTS:
+{% for site, url in r.accounts.items() %}
+  {{ site }}: {{ url }}
+{% else %}
+  None found
+{% endfor %}
+
+{% endfor %}
+"""
+
+SUMMARY_TEMPLATE = """\
+==================== SUMMARY ====================
+EMAILS CHECKED: {{ total }}
+{% if mx_checked %}
+DOMAIN ACTIVE: {{ mx }} ({{ "%.1f" | format(100.0 * mx / mx_checked) }}% of {{ mx_checked }} checked)
+{% endif %}
+GRAVATAR FOUND: {{ gravatar }} ({{ "%.1f" | format(ratio(gravatar)) }}%)
+ACCOUNTS FOUND PER SITE:
+{% for site, count in sites %}
+  {{ site }}: {{ count }} ({{ "%.1f" | format(ratio(count)) }}%)
+{% else %}
+  None found
+{% endfor %}
+"""
+
+_templates = None
+
+
+def _get_templates():
+    # Compiled once per process, on first use, and shared by every report.
+    global _templates
+    if _templates is None:
+        from jinja2 import Environment
+
+        env = Environment(trim_blocks=True, keep_trailing_newline=True, autoescape=False)
+        _templates = env.from_string(EMAIL_TEMPLATE), env.from_string(SUMMARY_TEMPLATE)
+    return _templates
+
+
+class ReportWriter:
+    def __init__(self, path=REPORT_PATH, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.total = 0
+        # emails whose MX was looked up (the dns stage ran), and how many had one
+        self.mx_checked = 0
+        self.mx = 0
+        self.gravatar = 0
+        self.sites = Counter()
+        self._pending = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "w", buffering=1 << 16)
+
+    def add(self, result):
+        self.total += 1
+        if result["mx"] is not None:
+            self.mx_checked += 1
+            self.mx += result["mx"]
+        self.gravatar += bool(result["gravatar"])
+        self.sites.update(result["accounts"].keys())
+        self._pending.append(result)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(_get_templates()[0].render(results=self._pending))
+            self._pending.clear()
+        self._file.flush()
+
+    def summary(self):
+        return _get_templates()[1].render(
+            total=self.total,
+            mx=self.mx,
+            mx_checked=self.mx_checked,
+            gravatar=self.gravatar,
+            sites=self.sites.most_common(),
+            ratio=lambda n: 100.0 * n / self.total if self.total else 0.0,
+        )
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.write(self.summary())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_report(results, path=REPORT_PATH):
+    with ReportWriter(path) as report:
+        for result in results:
+            report.add(result)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from storage.jsonl import read_results, RESULTS_PATH
+
+    build_report(read_results(sys.argv[1] if len(sys.argv) > 1 else RESULTS_PATH),
+                 sys.argv[2] if len(sys.argv) > 2 else REPORT_PATH)
@@ -0,0 +1,212 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+from core import metrics
+from core.email_utils import parse_email
+from core.pipeline import lookup
+from modules.social_accounts import find_social_accounts
+
+CACHE_SIZE = 100_000
+CACHE_TTL = 3600.0
+WORKERS = 32
+JOBS_SIZE = 10_000
+JOB_TTL = 3600.0
+
+
+class Coalescer:
+    # Caches encoded answers by key and shares one in-flight computation
+    # between every request for the same key, so N clients asking about one
+    # email trigger a single pipeline run.
+
+    def __init__(self, compute, executor, size=CACHE_SIZE, ttl=CACHE_TTL, on_result=None):
+        self.compute = compute
+        self.executor = executor
+        self.size = size
+        self.ttl = ttl
+        self.on_result = on_result
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+        self._cache = OrderedDict()
+        self._inflight = {}
+
+    async def get(self, key, *args):
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+        future = self._inflight.get(key)
+        if future is None:
+            self.stats["misses"] += 1
+            future = self._inflight[key] = asyncio.ensure_future(self._run(key, args))
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one client going away must not cancel the shared run
+        return await asyncio.shield(future)
+
+    async def _run(self, key, args):
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self.compute, *args)
+            if self.on_result:
+                self.on_result(result)
+            body = json.dumps(result).encode()
+            self._cache[key] = (time.monotonic() + self.ttl, body)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+            return body
+        finally:
+            del self._inflight[key]
+
+
+class _Handler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def send_json(self, body, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(body if isinstance(body, bytes) else json.dumps(body))
+
+
+class EmailHandler(_Handler):
+    async def get(self, email):
+        record = parse_email(email)
+        if record is None:
+            return self.send_json({"error": "malformed email address"}, 400)
+        self.send_json(await self.service.email(*record))
+
+
+class UsernameHandler(_Handler):
+    async def get(self, username):
+        self.send_json(await self.service.username(username))
+
+
+class BatchHandler(_Handler):
+    def post(self):
+        try:
+            emails = json.loads(self.request.body)["emails"]
+        except (ValueError, KeyError, TypeError):
+            emails = None
+        if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+            return self.send_json({"error": 'expected {"emails": [...]}'}, 400)
+        self.send_json({"job": self.service.submit(emails)}, 202)
+
+    def get(self, job_id=None):
+        job = self.service.job(job_id)
+        if job is None:
+            return self.send_json({"error": "unknown job"}, 404)
+        self.send_json(job)
+
+
+class StatsHandler(_Handler):
+    def get(self):
+        self.send_json({"email": self.service.emails.stats, "username": self.service.usernames.stats})
+
+
+class MetricsHandler(_Handler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(metrics.render())
+
+
+class Service:
+    def __init__(self, outputs=None, lookup=lookup, probe=find_social_accounts, workers=WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        on_result = outputs.write if outputs else None
+        self.emails = Coalescer(lookup, self.executor, on_result=on_result)
+        self.usernames = Coalescer(lambda username: {"username": username, "accounts": probe(username)},
+                                   self.executor)
+        self.jobs = {}
+        # job id -> expiry, in the order the jobs finished
+        self._finished = OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._tasks = set()
+        metrics.register_collector(self._collect)
+
+    def _collect(self):
+        for name, coalescer in (("service_email", self.emails), ("service_username", self.usernames)):
+            yield "osint_cache_requests_total", {"cache": name, "result": "hit"}, coalescer.stats["hits"]
+            yield "osint_cache_requests_total", {"cache": name, "result": "miss"}, coalescer.stats["misses"]
+            yield "osint_cache_requests_total", {"cache": name, "result": "coalesced"}, coalescer.stats["coalesced"]
+
+    def email(self, username, domain):
+        # Keyed on the address as given (the domain is already lowercase):
+        # Gravatar and the username probes depend on the exact address, so
+        # variants of one mailbox each get their own lookup.
+        return self.emails.get(f"{username}@{domain}", username, domain)
+
+    def username(self, username):
+        return self.usernames.get(username.lower(), username)
+
+    def submit(self, emails):
+        self._expire_jobs()
+        job_id = str(next(self._job_ids))
+        job = self.jobs[job_id] = {"done": False, "total": len(emails), "results": [], "rejected": [], "errors": []}
+
+        async def run():
+            try:
+                records = []
+                for email in emails:
+                    record = parse_email(email)
+                    if record is None:
+                        job["rejected"].append(email)
+                    else:
+                        records.append((email, record))
+                # One failed lookup is reported with its email; the others still finish.
+                answers = await asyncio.gather(*(self.email(*record) for _, record in records),
+                                               return_exceptions=True)
+                for (email, _), body in zip(records, answers):
+                    if isinstance(body, BaseException):
+                        job["errors"].append({"email": email, "error": f"{type(body).__name__}: {body}"})
+                    else:
+                        job["results"].append(json.loads(body))
+            except Exception as exc:
+                job["errors"].append({"email": None, "error": f"{type(exc).__name__}: {exc}"})
+            finally:
+                job["done"] = True
+                self._finished[job_id] = time.monotonic() + JOB_TTL
+
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def job(self, job_id):
+        self._expire_jobs()
+        return self.jobs.get(job_id)
+
+    def _expire_jobs(self):
+        # Finished jobs are kept for JOB_TTL, and only the newest JOBS_SIZE of
+        # them; running jobs are never dropped.
+        now = time.monotonic()
+        while self._finished:
+            job_id, expiry = next(iter(self._finished.items()))
+            if expiry > now and len(self.jobs) <= JOBS_SIZE:
+                break
+            del self._finished[job_id]
+            self.jobs.pop(job_id, None)
+
+    def make_app(self):
+        args = {"service": self}
+        return tornado.web.Application([
+            (r"/email/([^/]+)", EmailHandler, args),
+            (r"/username/([^/]+)", UsernameHandler, args),
+            (r"/batch", BatchHandler, args),
+            (r"/batch/([0-9]+)", BatchHandler, args),
+            (r"/stats", StatsHandler, args),
+            (r"/metrics", MetricsHandler, args),
+        ])
+
+
+async def serve(service, port=8080, address="127.0.0.1"):
+    server = service.make_app().listen(port, address)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.executor.shutdown(wait=False)
@@ -0,0 +1,116 @@
+import secrets
+import smtplib
+import socket
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import metrics
+
+VALID = "valid"
+INVALID = "invalid"
+CATCH_ALL = "catch_all"
+UNKNOWN = "unknown"
+
+
+class SMTPVerifier:
+    # Checks mailboxes with EHLO / MAIL FROM / RCPT TO and never sends DATA.
+    # Addresses are grouped by their primary MX host and each session checks
+    # up to max_rcpt of them, so the number of connections follows the number
+    # of distinct MX hosts rather than the number of emails.
+
+    def __init__(self, helo="localhost", mail_from="", port=25, timeout=10.0,
+                 per_host=2, max_rcpt=50, workers=32):
+        self.helo = helo
+        self.mail_from = mail_from
+        self.port = port
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_rcpt = max_rcpt
+        self.workers = workers
+        self.sessions = 0
+        self._catch_all = {}
+        self._probing = defaultdict(threading.Lock)
+        self._limits = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._lock = threading.Lock()
+        # One pool for every batch; its threads start on first use.
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp")
+
+    def close(self):
+        self._pool.shutdown()
+
+    def verify(self, items):
+        # items: iterable of (email, domain, mx_hosts ordered by priority).
+        # Returns {email: status}.
+        statuses = {}
+        by_host = defaultdict(list)
+        for email, domain, hosts in items:
+            if hosts:
+                by_host[hosts[0]].append((email, domain))
+            else:
+                statuses[email] = INVALID
+
+        jobs = [(host, pending[i:i + self.max_rcpt])
+                for host, pending in by_host.items()
+                for i in range(0, len(pending), self.max_rcpt)]
+        for result in self._pool.map(lambda job: self._session(*job), jobs):
+            statuses.update(result)
+        for status in statuses.values():
+            metrics.inc("osint_smtp_checks_total", status=status)
+        return statuses
+
+    def _session(self, host, pending):
+        with self._lock:
+            limit = self._limits[host]
+        with limit:
+            with self._lock:
+                self.sessions += 1
+            metrics.inc("osint_smtp_sessions_total")
+            try:
+                with smtplib.SMTP(host, self.port, local_hostname=self.helo, timeout=self.timeout) as smtp:
+                    smtp.ehlo_or_helo_if_needed()
+                    code, _ = smtp.mail(self.mail_from)
+                    if code != 250:
+                        return {email: UNKNOWN for email, _ in pending}
+                    return {email: self._check(smtp, email, domain) for email, domain in pending}
+            except (smtplib.SMTPException, OSError, socket.timeout):
+                return {email: UNKNOWN for email, _ in pending}
+
+    def _check(self, smtp, email, domain):
+        try:
+            catch_all = self._catch_all.get(domain)
+            if catch_all is None:
+                catch_all = self._probe_catch_all(smtp, domain)
+            status = _status(smtp.rcpt(email)[0])
+        except ValueError:
+            # UnicodeEncodeError: a non-ASCII address (a quoted local part
+            # can be one) cannot go into a plain RCPT command. Nothing was
+            # sent, so the session carries on with the next address.
+            return UNKNOWN
+        if status == VALID and catch_all is not False:
+            # accepted, but so would any address be (or we could not tell)
+            return CATCH_ALL if catch_all else UNKNOWN
+        return status
+
+    def _probe_catch_all(self, smtp, domain):
+        # A random mailbox that gets accepted means the domain accepts
+        # everything, so RCPT answers prove nothing there. One session per
+        # domain probes at a time; a temporary (4xx) answer is not kept, so
+        # the next check asks again. Returns None when still unknown.
+        with self._lock:
+            lock = self._probing[domain]
+        with lock:
+            if domain in self._catch_all:
+                return self._catch_all[domain]
+            code = smtp.rcpt(f"{secrets.token_hex(12)}@{domain}")[0]
+            if 200 <= code < 300 or 500 <= code < 600:
+                self._catch_all[domain] = 200 <= code < 300
+            return self._catch_all.get(domain)
+
+
+def _status(code):
+    if code in (250, 251):
+        return VALID
+    if code in (550, 551, 553):
+        return INVALID
+    return UNKNOWN
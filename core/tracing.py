@@ -0,0 +1,251 @@
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+
+from storage.jsonl import ROOT
+
+TRACES_PATH = os.path.join(ROOT, "output", "traces.jsonl")
+
+# One trace per email: a root span with a child for each stage and each HTTP
+# request. Spans are kept in memory until the root ends, then the whole trace
+# is either dropped or queued for a background thread that writes it as one
+# JSON object per span line.
+
+_local = threading.local()
+_tracer = None
+
+
+class Tracer:
+    def __init__(self, path=TRACES_PATH, sample=1.0, slow=None):
+        # sample: fraction of traces kept. slow: traces lasting at least this
+        # many seconds are kept whatever the sample says.
+        self.path = path
+        self.sample = sample
+        self.slow = slow
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a")
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, name="tracer", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans):
+        self._queue.put(spans)
+
+    def _write(self):
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                break
+            self._file.write("".join(json.dumps(span) + "\n" for span in spans))
+            if self._queue.empty():
+                self._file.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+class _Trace:
+    __slots__ = ("id", "sampled", "spans", "ids", "wall", "perf")
+
+    def __init__(self, sampled):
+        self.id = secrets.token_hex(8)
+        self.sampled = sampled
+        self.spans = []
+        self.ids = 0
+        self.wall = time.time()
+        self.perf = time.perf_counter()
+
+
+class Span:
+    __slots__ = ("trace", "name", "attrs", "id", "parent", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        trace = self.trace
+        self.id = trace.ids
+        trace.ids += 1
+        self.parent = getattr(_local, "span", None)
+        _local.span = self.id
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        trace = self.trace
+        trace.spans.append({
+            "trace": trace.id,
+            "span": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            # every span of a trace is timed on one clock, anchored to the root's wall time
+            "start": trace.wall + (self.start - trace.perf),
+            "duration": end - self.start,
+            "outcome": "ok" if exc_type is None else exc_type.__name__,
+            "attrs": self.attrs,
+        })
+        _local.span = self.parent
+
+
+class _Root(Span):
+    __slots__ = ()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        _local.trace = None
+        tracer = _tracer
+        if tracer is None:
+            return
+        duration = self.trace.spans[-1]["duration"]
+        if self.trace.sampled or (tracer.slow is not None and duration >= tracer.slow):
+            tracer.submit(self.trace.spans)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def trace(name, **attrs):
+    # Starts a trace in this thread, or a child span if one is already running.
+    if getattr(_local, "trace", None) is not None:
+        return span(name, **attrs)
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    sampled = tracer.sample >= 1.0 or random.random() < tracer.sample
+    if not sampled and tracer.slow is None:
+        return _NO_SPAN
+    _local.trace = _Trace(sampled)
+    _local.span = None
+    return _Root(_local.trace, name, attrs)
+
+
+def span(name, **attrs):
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NO_SPAN
+    return Span(trace, name, attrs)
+
+
+def start(path=TRACES_PATH, sample=1.0, slow=None):
+    global _tracer
+    _tracer = Tracer(path, sample, slow)
+    return _tracer
+
+
+def stop():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def read_traces(path=TRACES_PATH):
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace"]].append(span)
+    return traces
+
+
+def _end(span):
+    return span["start"] + span["duration"]
+
+
+def critical_path(spans):
+    # Walks back from the end of the root: the child that finished last is on
+    # the path, then the child that finished before that one started, and so
+    # on. Returns (depth, span, self time on the path) in start order.
+    children = defaultdict(list)
+    root = None
+    for span in spans:
+        if span["parent"] is None:
+            root = span
+        else:
+            children[span["parent"]].append(span)
+    path = []
+
+    def walk(span, depth):
+        index = len(path)
+        path.append(None)
+        cursor = _end(span)
+        critical = []
+        for child in sorted(children[span["span"]], key=_end, reverse=True):
+            if _end(child) <= cursor + 1e-6:
+                critical.append(child)
+                cursor = child["start"]
+        path[index] = (depth, span, max(0.0, span["duration"] - sum(c["duration"] for c in critical)))
+        for child in reversed(critical):
+            walk(child, depth + 1)
+
+    if root is not None:
+        walk(root, 0)
+    return path
+
+
+def label(span):
+    attrs = span["attrs"]
+    if "site" in attrs:
+        return f"{span['name']} {attrs['site']}"
+    if "email" in attrs:
+        return f"{span['name']} {attrs['email']}"
+    return span["name"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the critical path of the slowest traced emails")
+    parser.add_argument("path", nargs="?", default=TRACES_PATH)
+    parser.add_argument("--top", type=int, default=5, help="number of slowest traces to show")
+    args = parser.parse_args()
+
+    traces = read_traces(args.path)
+    paths = {trace_id: critical_path(spans) for trace_id, spans in traces.items()}
+    paths = {trace_id: path for trace_id, path in paths.items() if path}
+    slowest = sorted(paths.values(), key=lambda path: -path[0][1]["duration"])
+
+    for path in slowest[:args.top]:
+        total = path[0][1]["duration"]
+        print(f"\n{label(path[0][1])}: {total:.3f}s")
+        for depth, span, own in path[1:]:
+            outcome = "" if span["outcome"] == "ok" else f" [{span['outcome']}]"
+            print(f"{'  ' * depth}{label(span)}: {span['duration']:.3f}s, "
+                  f"{100 * own / total if total else 0:.0f}% on path{outcome}")
+
+    # Where critical-path time goes over every trace, by stage and site.
+    shares = defaultdict(float)
+    for path in paths.values():
+        for depth, span, own in path:
+            shares[label(span) if depth else "(outside any stage)"] += own
+    total = sum(path[0][1]["duration"] for path in paths.values())
+    print(f"\n{len(paths)} trace(s), {total:.3f}s in total; critical path time by stage and site:")
+    for name, seconds in sorted(shares.items(), key=lambda item: -item[1])[:20]:
+        print(f"{seconds:10.3f}s  {100 * seconds / total if total else 0:5.1f}%  {name}")
@@ -1,6 +1,126 @@
+import os
+import re
+from functools import lru_cache
+from string import Formatter
+from urllib.parse import quote_plus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_PATH = os.path.join(ROOT, "data", "dorks.txt")
+SEARCH_URL = "https://www.google.com/search?q={query}"
+
+SCOPES = ("email", "username", "domain")
+# Fields a query of each scope may use: a domain dork is generated once per
+# domain, so it cannot depend on the email it happened to be generated for.
+FIELDS = {"email": {"email", "username", "domain"}, "username": {"username"}, "domain": {"domain"}}
+
+# Each template is compiled once into a %-format string whose literal parts
+# are already URL-encoded, so generating a dork is one % over the encoded
+# fields of an email. Percent-encoding works character by character, which
+# makes encoding the parts separately the same as encoding the whole query.
+# The username is encoded once per email (most need no encoding at all) and
+# the domain once per run.
+_UNRESERVED = re.compile(r"[A-Za-z0-9_.~-]*").fullmatch
+
+_dorks = None
+
+
+def load_templates(path=TEMPLATES_PATH):
+    # Returns (scope, name, query) tuples from a dorks file.
+    templates = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [part.strip() for part in line.split("|", 2)]
+            if len(parts) != 3 or parts[0] not in SCOPES:
+                raise ValueError(f"{path}:{number}: expected 'scope | name | query' with scope in {', '.join(SCOPES)}")
+            templates.append(tuple(parts))
+    return templates
+
+
+def compile_template(scope, query, url=SEARCH_URL):
+    prefix, _, suffix = url.partition("{query}")
+    parts = [prefix]
+    for literal, field, spec, conversion in Formatter().parse(query):
+        parts.append(quote_plus(literal))
+        if field is None:
+            continue
+        if field not in FIELDS[scope] or spec or conversion:
+            raise ValueError(f"{{{field}}} cannot be used in a {scope} dork: {query!r}")
+        parts.append(f"\0{field}\0")
+    parts.append(suffix)
+    # every literal % (from the encoding or the URL) is escaped, then fields become %(name)s
+    return "".join(parts).replace("%", "%%").replace("\0email\0", "%(email)s") \
+        .replace("\0username\0", "%(username)s").replace("\0domain\0", "%(domain)s")
+
+
+@lru_cache(maxsize=65536)
+def _quote_domain(domain):
+    return quote_plus(domain)
+
+
+def _quote(value):
+    return value if _UNRESERVED(value) else quote_plus(value)
+
+
+class Dorks:
+    def __init__(self, templates=None, url=SEARCH_URL):
+        if templates is None:
+            templates = load_templates()
+        self.compiled = {scope: [] for scope in SCOPES}
+        for scope, name, query in templates:
+            self.compiled[scope].append((name, compile_template(scope, query, url)))
+        # usernames and domains whose dorks were already generated this run
+        self.usernames = set()
+        self.domains = set()
+
+    def generate(self, username, domain, scopes=SCOPES):
+        # {name: url} for one email.
+        quoted = _quote(username)
+        domain = _quote_domain(domain)
+        values = {"email": f"{quoted}%40{domain}", "username": quoted, "domain": domain}
+        return {name: fmt % values for scope in scopes for name, fmt in self.compiled[scope]}
+
+    def batch(self, records):
+        # records: (username, domain) pairs. Returns {name: url} per record;
+        # username and domain dorks only come with the first record that has
+        # that username or domain.
+        email_dorks = self.compiled["email"]
+        username_dorks = self.compiled["username"]
+        domain_dorks = self.compiled["domain"]
+        usernames, domains = self.usernames, self.domains
+        out = []
+        for username, domain in records:
+            quoted = _quote(username)
+            encoded = _quote_domain(domain)
+            values = {"email": f"{quoted}%40{encoded}", "username": quoted, "domain": encoded}
+            dorks = {name: fmt % values for name, fmt in email_dorks}
+            if username_dorks and username not in usernames:
+                usernames.add(username)
+                for name, fmt in username_dorks:
+                    dorks[name] = fmt % values
+            if domain_dorks and domain not in domains:
+                domains.add(domain)
+                for name, fmt in domain_dorks:
+                    dorks[name] = fmt % values
+            out.append(dorks)
+        return out
+
+
+def get_dorks():
+    # The run's template set, loaded from data/dorks.txt on first use.
+    global _dorks
+    if _dorks is None:
+        _dorks = Dorks()
+    return _dorks
+
+
+def use_templates(path):
+    global _dorks
+    _dorks = Dorks(load_templates(path))
+
+
 def generate_dorks(email):
-    return {
-        "Exact match": f'https://www.google.com/search?q="{email}"',
-        "Paste sites": f'https://www.google.com/search?q="{email}"+paste',
-        "PDF files": f'https://www.google.com/search?q="{email}"+filetype:pdf',
-    }
+    username, _, domain = email.rpartition("@")
+    return get_dorks().generate(username, domain)
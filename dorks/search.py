@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from html import unescape
+from urllib.parse import parse_qs, quote_plus, urlsplit
+
+from core import metrics
+from core.http import get_session, set_rate_limit
+
+SEARCH_BACKEND = "https://www.google.com/search?q={query}"
+SEARCH_RATE = 1.0
+SEARCH_WORKERS = 8
+MAX_RESULTS = 10
+CACHE_SIZE = 100_000
+CACHE_TTL = 24 * 3600.0
+
+# Runs the generated dork queries against a search backend (any URL with a
+# {query} placeholder that answers with an HTML result page) and keeps the
+# result links. Links come from a regex over <a href> rather than a parsed
+# page: navigation back to the search engine and relative links are dropped,
+# and Google's /url?q= redirects are unwrapped. Results are cached by
+# normalized query (case and spacing, but not the OR / AND operators), so the
+# same query from two dorks, two batches or two emails is fetched once per
+# CACHE_TTL; the backend gets the query as written. Requests go through the
+# shared session and so share its in-flight cap; the backend host is limited
+# to SEARCH_RATE requests per second.
+
+_HREF = re.compile(rb"""<a\s[^>]*?href\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.I)
+
+_searcher = None
+
+
+_OPERATORS = {"OR", "AND"}
+
+
+def normalize(query):
+    # Cache key only: search engines ignore case, except in their operators.
+    return " ".join(word if word in _OPERATORS else word.lower() for word in query.split())
+
+
+def query_of(url):
+    # The search query of a dork URL.
+    values = parse_qs(urlsplit(url).query).get("q")
+    return values[0] if values else ""
+
+
+def result_links(data, backend_host, limit=MAX_RESULTS):
+    links = []
+    for match in _HREF.finditer(data):
+        href = unescape((match.group(1) or match.group(2)).decode("utf-8", "replace"))
+        if href.startswith("/url?"):
+            href = parse_qs(href[5:]).get("q", [""])[0]
+        if not href.startswith(("http://", "https://")):
+            continue
+        host = urlsplit(href).hostname or ""
+        if host == backend_host or host.endswith("." + backend_host) or href in links:
+            continue
+        links.append(href)
+        if len(links) >= limit:
+            break
+    return links
+
+
+class Searcher:
+    def __init__(self, backend=SEARCH_BACKEND, rate=SEARCH_RATE, workers=SEARCH_WORKERS, size=CACHE_SIZE,
+                 ttl=CACHE_TTL):
+        self.backend = backend
+        self.host = urlsplit(backend).hostname or ""
+        self.workers = workers
+        self.size = size
+        self.ttl = ttl
+        if rate:
+            set_rate_limit(self.host, rate)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+        return None
+
+    def search(self, query):
+        # Result links for one query; failed searches are not cached.
+        key = normalize(query)
+        links = self._cached(key)
+        if links is not None:
+            metrics.inc("osint_cache_requests_total", cache="serp", result="hit")
+            return links
+        metrics.inc("osint_cache_requests_total", cache="serp", result="miss")
+        try:
+            r = get_session().get(self.backend.format(query=quote_plus(query)), timeout=10)
+        except Exception:
+            return []
+        if r.status_code != 200:
+            return []
+        links = result_links(r.content, self.host)
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, links)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return links
+
+    def search_all(self, queries):
+        # {query: links}, each distinct normalized query fetched once (as
+        # the first query with that key was written).
+        keys = {query: normalize(query) for query in queries}
+        distinct = {}
+        for query, key in keys.items():
+            distinct.setdefault(key, query)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search")
+        found = dict(zip(distinct, self._pool.map(self.search, distinct.values())))
+        return {query: found[key] for query, key in keys.items()}
+
+
+def get_searcher():
+    global _searcher
+    if _searcher is None:
+        _searcher = Searcher()
+    return _searcher
+
+
+def use_backend(backend, rate=SEARCH_RATE):
+    global _searcher
+    _searcher = Searcher(backend, rate)
+
+
+def search_dorks(results):
+    # Adds {dork name: result links} to each result that has dorks.
+    queries = {url: query_of(url) for result in results for url in result["dorks"].values()}
+    links = get_searcher().search_all(queries.values())
+    for result in results:
+        result["search"] = {name: links[queries[url]] for name, url in result["dorks"].items()}
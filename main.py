@@ -1,42 +1,343 @@
+import argparse
 import sys
 import os
 
 # Allow local module imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from core.email_utils import extract_username, extract_domain
-from core.domain import domain_has_mx
-from core.gravatar import gravatar_lookup
-from modules.social_accounts import find_social_accounts
+import core.domain
+from core import metrics, profiling, tracing
+from core.canonical import dedupe
+from core.email_utils import parse_emails
+from core.pipeline import DEFAULT_STAGES, STAGES, batches, process_batch
+from core.report import REPORT_PATH
+from storage.database import DB_PATH
+from storage.index import InvertedIndex, INDEX_DIR, KINDS
+from storage.jsonl import RESULTS_PATH
+from storage.outputs import Outputs
 
 
-def main(email):
-    # Parse email data
-    username = extract_username(email)
-    domain = extract_domain(email)
+def print_result(result):
+    print("\nEMAIL:", result["email"])
+    print("USERNAME:", result["username"])
+    if result["domain_type"]:
+        print("DOMAIN TYPE:", result["domain_type"])
+    if result["dns"]:
+        print("DOMAIN ACTIVE:", result["mx"])
+        if result["dns"]["null_mx"]:
+            print("NULL MX: domain accepts no mail")
+        for mx in result["dns"]["mx"]:
+            print(f"MX: {mx['priority']} {mx['host']} {' '.join(mx['addresses'])}")
+        print("SPF:", result["dns"]["spf"] or "None")
+        print("DMARC:", result["dns"]["dmarc"] or "None")
+    if "smtp" in result:
+        print("MAILBOX:", result["smtp"] or "not checked")
+    print("GRAVATAR:", result["gravatar"] if result["gravatar"] else "None")
 
-    print("\nEMAIL:", email)
-    print("USERNAME:", username)
-    print("DOMAIN ACTIVE:", domain_has_mx(domain))
-
-    # Gravatar check
-    avatar = gravatar_lookup(email)
-    print("GRAVATAR:", avatar if avatar else "None")
-
-    # Social accounts discovery
     print("\nFOUND SOCIAL ACCOUNTS:")
-    accounts = find_social_accounts(username)
-    if accounts:
-        for site, url in accounts.items():
+    if result["accounts"]:
+        for site, url in result["accounts"].items():
             print(f"{site}: {url}")
+            for field, value in result.get("profiles", {}).get(site, {}).items():
+                print(f"  {field}: {', '.join(value) if isinstance(value, list) else value}")
     else:
         print("None found")
 
+    if result.get("dorks"):
+        print("\nSEARCH DORKS:")
+        for name, url in result["dorks"].items():
+            print(f"{name}: {url}")
+            for link in result.get("search", {}).get(name, ()):
+                print(f"  {link}")
+
+
+def print_summary(stats):
+    if stats.get("rejected"):
+        print(f"\nSKIPPED {stats['rejected']} MALFORMED EMAIL(S)")
+    if stats.get("duplicates"):
+        ratio = 100.0 * stats["duplicates"] / stats["parsed"]
+        print(f"SKIPPED {stats['duplicates']} DUPLICATE EMAIL(S) ({ratio:.1f}% of input)")
+    if stats.get("disposable"):
+        print(f"SKIPPED {stats['disposable']} DISPOSABLE EMAIL(S)")
+
+
+def write_metrics(path, stats=None):
+    # Input-side outcomes live in stats; stage outcomes were counted as they ran.
+    for key, outcome in (("rejected", "rejected"), ("duplicates", "duplicate")):
+        if stats and stats.get(key):
+            metrics.inc("osint_emails_total", stats[key], outcome=outcome)
+    metrics.write(path)
+
+
+def main(emails, output=RESULTS_PATH, compress=False, report=REPORT_PATH, db=None, index=None,
+         skip_disposable=False, verifier=None, batch_size=100, stages=DEFAULT_STAGES, metrics_path=None,
+         bitmaps=False, columnar=False, validate=None):
+    # emails is an iterable of raw addresses or the path of a file with one per line
+    stats = {}
+    with Outputs(output, compress, report, db, index, bitmaps, columnar, validate) as outputs:
+        records = profiling.iterate("parse", dedupe(parse_emails(emails, stats), stats))
+        # Emails are only batched when a stage works on whole batches.
+        for batch in batches(records, batch_size if verifier or "dorks" in stages else 1):
+            for result in process_batch(batch, stats, skip_disposable, verifier, stages):
+                print_result(result)
+                with profiling.stage("output"):
+                    outputs.write(result)
+    print_summary(stats)
+    if outputs.validator and outputs.validator.violations:
+        print(f"{outputs.validator.violations} SCHEMA VIOLATION(S), SEE {outputs.validator.path}")
+    if metrics_path:
+        write_metrics(metrics_path, stats)
+
+
+def _input_args(parser):
+    parser.add_argument("emails", nargs="*")
+    parser.add_argument("-f", "--file", help="read emails from a file, one per line")
+
+
+def _output_args(parser):
+    parser.add_argument("-o", "--output", default=RESULTS_PATH, help="JSONL result file")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the result file")
+    parser.add_argument("--report", default=REPORT_PATH, help="text report file")
+    parser.add_argument("--db", nargs="?", const=DB_PATH, help="also store results in a SQLite database")
+    parser.add_argument("--index", nargs="?", const=INDEX_DIR, help="also add results to the inverted index")
+    parser.add_argument("--bitmaps", action="store_true",
+                        help="also keep per-site bitmaps next to the result file (python -m storage.bitmaps)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="also write results in the columnar binary format next to the result file")
+    parser.add_argument("--validate", nargs="?", const=1.0, type=float, metavar="RATIO",
+                        help="check the results (or this share of them) against the result schema; "
+                             "violations go to output/violations.jsonl")
+
+
+def _metrics_arg(parser):
+    parser.add_argument("--metrics", nargs="?", const=metrics.METRICS_PATH,
+                        help="write Prometheus metrics (stage and site latencies, caches, DNS) at the end")
+
+
+def _trace_args(parser):
+    parser.add_argument("--trace", nargs="?", const=tracing.TRACES_PATH,
+                        help="write one trace per email (stage and HTTP request spans) to a JSONL file")
+    parser.add_argument("--trace-sample", type=float, default=1.0, help="fraction of emails to trace")
+    parser.add_argument("--trace-slow", type=float,
+                        help="always keep traces of emails taking at least this many seconds")
+
+
+def _profile_arg(parser):
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR,
+                        help="profile each stage (cProfile and tracemalloc) and write the results to this directory")
+
+
+def _print_profile(summary):
+    if summary:
+        print(f"\nPROFILE WRITTEN TO {os.path.dirname(summary)}")
+        with open(summary) as f:
+            print(f.read(), end="")
+
+
+def _start_tracing(args):
+    if args.trace:
+        tracing.start(args.trace, args.trace_sample, args.trace_slow)
+
+
+def _stage_list(value):
+    stages = tuple(stage.strip() for stage in value.split(",") if stage.strip())
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(sorted(unknown))} "
+                                         f"(choose from {', '.join(STAGES)})")
+    return stages
+
+
+def _stage_args(parser):
+    parser.add_argument("--stages", type=_stage_list, default=DEFAULT_STAGES,
+                        help=f"comma-separated stages to run (default: {','.join(DEFAULT_STAGES)}; "
+                             f"available: {','.join(STAGES)})")
+    parser.add_argument("--skip-disposable", action="store_true", help="do not look up disposable addresses")
+    parser.add_argument("--group-by-registered-domain", action="store_true",
+                        help="share DNS results between subdomains of the same registered domain")
+    parser.add_argument("--dork-templates", help="search dork templates for the dorks stage (default: data/dorks.txt)")
+    parser.add_argument("--search-backend", help="search URL with a {query} placeholder for the search stage "
+                                                 "(default: Google)")
+    parser.add_argument("--search-rate", type=float, default=1.0,
+                        help="searches per second sent to the search backend (0: no limit)")
+    parser.add_argument("--smtp", action="store_true", help="check mailboxes over SMTP (RCPT TO, nothing is sent)")
+    parser.add_argument("--smtp-helo", default="localhost", help="host name announced in EHLO")
+    parser.add_argument("--smtp-from", default="", help="MAIL FROM address (empty for the null sender)")
+
+
+def _configure_stages(args):
+    core.domain.group_by_registered_domain = args.group_by_registered_domain
+    if args.dork_templates:
+        from dorks.google_dorks import use_templates
+
+        use_templates(args.dork_templates)
+    if "search" in args.stages:
+        if "dorks" not in args.stages:
+            sys.exit("the search stage needs the dorks stage")
+        from dorks.search import SEARCH_BACKEND, use_backend
+
+        use_backend(args.search_backend or SEARCH_BACKEND, args.search_rate)
+    if not args.smtp:
+        return None
+    if "dns" not in args.stages:
+        sys.exit("--smtp needs the dns stage")
+    from core.smtp import SMTPVerifier
+
+    return SMTPVerifier(helo=args.smtp_helo, mail_from=args.smtp_from)
+
+
+def scan_command(argv):
+    parser = argparse.ArgumentParser(usage="python main.py email@example.com [email ...] | -f emails.txt")
+    _input_args(parser)
+    _output_args(parser)
+    _metrics_arg(parser)
+    _trace_args(parser)
+    _profile_arg(parser)
+    _stage_args(parser)
+    args = parser.parse_args(argv)
+    if not args.emails and not args.file:
+        parser.error("no email given")
+
+    verifier = _configure_stages(args)
+    _start_tracing(args)
+    if args.profile:
+        profiling.start(args.profile)
+    try:
+        main(args.file or args.emails, args.output, args.gzip, args.report, args.db, args.index,
+             args.skip_disposable, verifier, stages=args.stages, metrics_path=args.metrics,
+             bitmaps=args.bitmaps, columnar=args.columnar, validate=args.validate)
+    finally:
+        if verifier:
+            verifier.close()
+        tracing.stop()
+        _print_profile(profiling.stop())
+
+
+def coordinator_command(argv):
+    from core.distributed import run_coordinator, WORK_ENDPOINT, ACK_ENDPOINT
+
+    parser = argparse.ArgumentParser(prog="python main.py coordinator",
+                                     description="Hand out email batches to distributed workers")
+    _input_args(parser)
+    parser.add_argument("--work", default=WORK_ENDPOINT, help="endpoint workers ask for batches on")
+    parser.add_argument("--acks", default=ACK_ENDPOINT, help="endpoint the sink confirms batches on")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--lease-timeout", type=float, default=300.0,
+                        help="seconds before an unconfirmed batch is handed out again")
+    _metrics_arg(parser)
+    args = parser.parse_args(argv)
+    if not args.emails and not args.file:
+        parser.error("no email given")
+
+    stats = {}
+    done = run_coordinator(dedupe(parse_emails(args.file or args.emails, stats), stats),
+                           args.batch_size, args.lease_timeout, args.work, args.acks)
+    print(f"{done['batches']} BATCH(ES) DONE, {done['released']} RE-LEASED")
+    print_summary(stats)
+    if args.metrics:
+        write_metrics(args.metrics, stats)
+
+
+def worker_command(argv):
+    from core.distributed import run_worker, WORK_ENDPOINT, RESULTS_ENDPOINT
+
+    parser = argparse.ArgumentParser(prog="python main.py worker",
+                                     description="Run pipeline stages for batches from a coordinator")
+    parser.add_argument("--work", default=WORK_ENDPOINT, help="coordinator endpoint")
+    parser.add_argument("--results", default=RESULTS_ENDPOINT, help="sink endpoint")
+    _metrics_arg(parser)
+    _trace_args(parser)
+    _profile_arg(parser)
+    _stage_args(parser)
+    args = parser.parse_args(argv)
+
+    verifier = _configure_stages(args)
+    _start_tracing(args)
+    if args.profile:
+        profiling.start(args.profile)
+    try:
+        processed = run_worker(args.work, args.results, args.skip_disposable, verifier, args.stages)
+    finally:
+        if verifier:
+            verifier.close()
+        tracing.stop()
+        _print_profile(profiling.stop())
+    print(f"{processed} BATCH(ES) PROCESSED")
+    if args.metrics:
+        write_metrics(args.metrics)
+
+
+def sink_command(argv):
+    from core.distributed import run_sink, RESULTS_ENDPOINT, ACK_ENDPOINT
+
+    parser = argparse.ArgumentParser(prog="python main.py sink",
+                                     description="Collect worker results into the outputs")
+    parser.add_argument("--results", default=RESULTS_ENDPOINT, help="endpoint workers push results to")
+    parser.add_argument("--acks", default=ACK_ENDPOINT, help="coordinator endpoint for confirmations")
+    _output_args(parser)
+    args = parser.parse_args(argv)
+
+    with Outputs(args.output, args.gzip, args.report, args.db, args.index, args.bitmaps,
+                 args.columnar, args.validate) as outputs:
+        stored = run_sink(outputs, args.results, args.acks, on_result=print_result)
+    print(f"\n{stored} BATCH(ES) STORED")
+
+
+def serve_command(argv):
+    import asyncio
+    from core.service import Service, serve
+
+    parser = argparse.ArgumentParser(prog="python main.py serve",
+                                     description="Run the lookup HTTP API with warm caches and connection pools")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--group-by-registered-domain", action="store_true",
+                        help="share DNS results between subdomains of the same registered domain")
+    _output_args(parser)
+    _trace_args(parser)
+    args = parser.parse_args(argv)
+    core.domain.group_by_registered_domain = args.group_by_registered_domain
+
+    _start_tracing(args)
+    with Outputs(args.output, args.gzip, args.report, args.db, args.index, args.bitmaps,
+                 args.columnar, args.validate) as outputs:
+        print(f"Listening on http://{args.address}:{args.port}")
+        try:
+            asyncio.run(serve(Service(outputs), args.port, args.address))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            tracing.stop()
+
+
+def index_command(argv):
+    parser = argparse.ArgumentParser(prog="python main.py index",
+                                     description="List every email indexed under a username, domain or profile URL")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("value")
+    parser.add_argument("--dir", default=INDEX_DIR, help="index directory")
+    args = parser.parse_args(argv)
+
+    with InvertedIndex(args.dir) as inverted:
+        emails = inverted.lookup(args.kind, args.value)
+    for email in emails:
+        print(email)
+    if not emails:
+        print("None found")
+
+
+COMMANDS = {
+    "index": index_command,
+    "coordinator": coordinator_command,
+    "worker": worker_command,
+    "sink": sink_command,
+    "serve": serve_command,
+}
+
 
 # Script entry point
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python main.py email@example.com")
-        sys.exit(1)
-
-    main(sys.argv[1])
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        scan_command(sys.argv[1:])
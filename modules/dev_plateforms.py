@@ -1,14 +1,19 @@
-import requests
+from core.http import probe_sites
 
 DEVS = {
     "GitLab": "https://gitlab.com/{}",
     "Bitbucket": "https://bitbucket.org/{}",
 }
 
-def find_dev_accounts(username):
-    results = {}
-    for p, url in DEVS.items():
-        r = requests.get(url.format(username))
-        if r.status_code == 200:
-            results[p] = url.format(username)
-    return results
+PROFILE_FIELDS = {
+    "GitLab": {
+        "display_name": ("meta:og:title",),
+        "bio": ("meta:og:description", "meta:description"),
+    },
+    "Bitbucket": {
+        "display_name": ("meta:og:title",),
+    },
+}
+
+def find_dev_accounts(username, pages=None):
+    return probe_sites(DEVS, username, pages=pages)
@@ -0,0 +1,38 @@
+from core.http import get_session
+from core.pages import extract_profile
+from modules.dev_plateforms import PROFILE_FIELDS as DEV_FIELDS
+from modules.social_accounts import PROFILE_FIELDS as SOCIAL_FIELDS
+
+# Forums (Reddit, Medium) are social sites too and share their fields.
+PROFILE_FIELDS = {**SOCIAL_FIELDS, **DEV_FIELDS}
+
+def extract_profiles(accounts, pages=None):
+    # accounts: {site: profile URL} as found by the probes, pages: {site: page
+    # body} the probes already downloaded. Pages missing from it are fetched
+    # one after another while earlier ones are being parsed.
+    pages = pages or {}
+    pending = {}
+    for site, url in accounts.items():
+        spec = PROFILE_FIELDS.get(site)
+        if not spec:
+            continue
+        body = pages.get(site)
+        if body is None:
+            try:
+                r = get_session().get(url, timeout=5)
+            except Exception:
+                continue
+            if r.status_code != 200:
+                continue
+            body = r.content
+        pending[site] = extract_profile(body, spec)
+
+    profiles = {}
+    for site, future in pending.items():
+        try:
+            fields = future.result()
+        except Exception:
+            continue
+        if fields:
+            profiles[site] = fields
+    return profiles
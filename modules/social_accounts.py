@@ -1,4 +1,4 @@
-import requests
+from core.http import probe_sites
 
 SOCIAL_SITES = {
     "GitHub": "https://github.com/{}",
@@ -9,13 +9,46 @@ SOCIAL_SITES = {
     "Medium": "https://medium.com/@{}"
 }
 
-def find_social_accounts(username):
-    results = {}
-    for site, url in SOCIAL_SITES.items():
-        try:
-            r = requests.get(url.format(username), timeout=5)
-            if r.status_code == 200:
-                results[site] = url.format(username)
-        except:
-            pass
-    return results
+# Sites answering 200 with a "not found" page for unknown profiles.
+SOFT_404 = {
+    "Instagram": ("Page not found", "Page Not Found"),
+    "Facebook": ("Page not found", "Content not found", "Content Not Found"),
+}
+
+# Profile fields extracted from found accounts (see core.extract for sources).
+PROFILE_FIELDS = {
+    "GitHub": {
+        "display_name": ("ld:name", "meta:og:title"),
+        "bio": ("ld:description", "meta:og:description", "meta:description"),
+        "followers": ("ld:followers",),
+        "links": ("ld:links",),
+    },
+    "Twitter": {
+        "display_name": ("ld:name", ("meta:og:title", r"^(.*?) \(@")),
+        "bio": ("ld:description", "meta:og:description"),
+        "followers": ("ld:followers",),
+        "links": ("ld:links",),
+    },
+    "Instagram": {
+        "display_name": (("meta:og:title", r"^(.*?) \(@"),),
+        "bio": (("meta:description", r"on Instagram: \"(.*)\"$"),),
+        "followers": (("meta:og:description", r"([\d.,]+[KkMm]?) Followers"),),
+    },
+    "Facebook": {
+        "display_name": ("meta:og:title",),
+        "bio": ("meta:og:description",),
+    },
+    "Reddit": {
+        "display_name": ("meta:og:title",),
+        "bio": ("meta:og:description",),
+    },
+    "Medium": {
+        "display_name": ("ld:name", "meta:og:title"),
+        "bio": ("ld:description", "meta:description"),
+        "followers": (("meta:description", r"([\d.,]+[KkMm]?) Followers"),),
+        "links": ("ld:links",),
+    },
+}
+
+def find_social_accounts(username, pages=None):
+    return probe_sites(SOCIAL_SITES, username, SOFT_404, pages)
@@ -0,0 +1,383 @@
+import operator
+import os
+import re
+import struct
+from array import array
+
+from storage.jsonl import RESULTS_PATH
+from storage.records import GRAVATAR_FLAG, MX_FLAG, SITE_NAMES, flags_of
+
+
+def bitmaps_path(results_path):
+    # output/results.json(.gz) -> output/results.bitmaps
+    base = results_path[:-3] if results_path.endswith(".gz") else results_path
+    return os.path.splitext(base)[0] + ".bitmaps"
+
+
+BITMAPS_PATH = bitmaps_path(RESULTS_PATH)
+
+# One bitmap per site (plus mx, gravatar and all) over email IDs, the
+# position of each result in the result stream. Bitmaps are split into
+# chunks of 65536 IDs, roaring-style. In memory every chunk is a Python int
+# used as a 65536-bit set, so &, |, ^ and ~ over a chunk run in C; a query
+# walks the chunks once and evaluates the whole expression per chunk. On disk
+# each chunk is stored as whichever is smallest: a sorted array of 16-bit
+# offsets (sparse chunks), runs of (start, length - 1) pairs (mx, all, and
+# batches of similar emails) or the raw 8 KiB bitmap.
+CHUNK_BITS = 16
+CHUNK = 1 << CHUNK_BITS
+
+MAGIC = b"OSBM"
+_HEADER = struct.Struct("<4sIQ")
+_CONTAINER = struct.Struct("<IBI")
+ARRAY, RUNS, BITMAP = 0, 1, 2
+
+FLAGS = [(name, 1 << i) for i, name in enumerate(SITE_NAMES)] + [("mx", MX_FLAG), ("gravatar", GRAVATAR_FLAG)]
+# x ^ (x & y) is x & ~y without building the (much slower) negative int ~y
+OPERATORS = {"&": operator.and_, "|": operator.or_, "^": operator.xor, "-": lambda x, y: x ^ (x & y)}
+
+
+def _positions(bits):
+    # Offsets of the set bits of one chunk, ascending.
+    out = []
+    for w, word in enumerate(memoryview(bits.to_bytes(CHUNK // 8, "little")).cast("Q")):
+        while word:
+            low = word & -word
+            out.append(w * 64 + low.bit_length() - 1)
+            word ^= low
+    return out
+
+
+def _from_positions(positions):
+    data = bytearray(CHUNK // 8)
+    for pos in positions:
+        data[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(data, "little")
+
+
+def _encode(bits):
+    # -> (kind, count, payload) for the smallest container.
+    cardinality = bits.bit_count()
+    starts = bits & ~(bits << 1)
+    runs = starts.bit_count()
+    if 4 * runs < min(2 * cardinality, CHUNK // 8):
+        ends = bits & ~(bits >> 1)
+        pairs = array("H")
+        for start, end in zip(_positions(starts), _positions(ends)):
+            pairs.extend((start, end - start))
+        return RUNS, runs, pairs.tobytes()
+    if 2 * cardinality < CHUNK // 8:
+        return ARRAY, cardinality, array("H", _positions(bits)).tobytes()
+    return BITMAP, cardinality, bits.to_bytes(CHUNK // 8, "little")
+
+
+def _decode(kind, count, data):
+    if kind == BITMAP:
+        return int.from_bytes(data, "little")
+    values = array("H")
+    values.frombytes(data)
+    if kind == ARRAY:
+        return _from_positions(values)
+    bits = 0
+    for i in range(0, 2 * count, 2):
+        bits |= ((1 << (values[i + 1] + 1)) - 1) << values[i]
+    return bits
+
+
+class Bitmap:
+    # A set of email IDs: chunk i holds IDs i * CHUNK to (i + 1) * CHUNK - 1.
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks if chunks is not None else []
+
+    def __len__(self):
+        return sum(chunk.bit_count() for chunk in self.chunks)
+
+    def __contains__(self, email_id):
+        key = email_id >> CHUNK_BITS
+        return key < len(self.chunks) and bool(self.chunks[key] >> (email_id & (CHUNK - 1)) & 1)
+
+    def __iter__(self):
+        for key, chunk in enumerate(self.chunks):
+            if chunk:
+                base = key << CHUNK_BITS
+                for pos in _positions(chunk):
+                    yield base + pos
+
+    def _combine(self, other, op):
+        a, b = self.chunks, other.chunks
+        n = max(len(a), len(b))
+        a, b = a + [0] * (n - len(a)), b + [0] * (n - len(b))
+        return Bitmap([op(x, y) for x, y in zip(a, b)])
+
+    def __and__(self, other):
+        return self._combine(other, OPERATORS["&"])
+
+    def __or__(self, other):
+        return self._combine(other, OPERATORS["|"])
+
+    def __xor__(self, other):
+        return self._combine(other, OPERATORS["^"])
+
+    def __sub__(self, other):
+        return self._combine(other, OPERATORS["-"])
+
+
+class BitmapBuilder:
+    # Collects the IDs of one chunk at a time in a bytearray; IDs arrive in
+    # increasing order from the result stream.
+    __slots__ = ("bitmap", "key", "pending")
+
+    def __init__(self, bitmap, key=0):
+        self.bitmap = bitmap
+        self.key = key
+        self.pending = bytearray(CHUNK // 8)
+
+    def add(self, email_id):
+        key = email_id >> CHUNK_BITS
+        if key != self.key:
+            self.flush(key)
+        pos = email_id & (CHUNK - 1)
+        self.pending[pos >> 3] |= 1 << (pos & 7)
+
+    def flush(self, next_key=None):
+        chunks = self.bitmap.chunks
+        if self.key < len(chunks):
+            chunks[self.key] |= int.from_bytes(self.pending, "little")
+        else:
+            chunks.extend([0] * (self.key - len(chunks)))
+            chunks.append(int.from_bytes(self.pending, "little"))
+        self.pending = bytearray(CHUNK // 8)
+        if next_key is not None:
+            self.key = next_key
+
+
+# Query expressions: site names (any case), mx, gravatar and all, combined
+# with & (and), | (or), ^ (xor), - (and not), unary ~ / ! / not, and
+# parentheses. "GitHub & Reddit & ~Twitter"
+_TOKEN = re.compile(r"\s*(?:([()&|^~!-])|(?i:(and|or|xor|not)\b)|([A-Za-z0-9_.]+))")
+_WORDS = {"and": "&", "or": "|", "xor": "^", "not": "~"}
+
+
+def _tokens(expression):
+    pos, tokens = 0, []
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if match is None:
+            raise ValueError(f"unexpected {expression[pos:].strip()!r} in query")
+        symbol, word, name = match.groups()
+        tokens.append(symbol or _WORDS.get((word or "").lower()) or ("name", name))
+        pos = match.end()
+    return tokens
+
+
+def _apply(op, left, right):
+    return lambda k: op(left(k), right(k))
+
+
+class _Parser:
+    # Compiles an expression into a function of the chunk index returning
+    # that chunk of the result.
+    def __init__(self, expression, chunks):
+        self.tokens = _tokens(expression)
+        self.chunks = chunks
+        self.names = {name.lower(): name for name in chunks}
+
+    def parse(self):
+        fn = self._or()
+        if self.tokens:
+            raise ValueError(f"unexpected {self.tokens[0]!r} in query")
+        return fn
+
+    def _take(self, *symbols):
+        if self.tokens and self.tokens[0] in symbols:
+            return self.tokens.pop(0)
+        return None
+
+    def _or(self):
+        fn = self._and()
+        while (op := self._take("|", "^")) is not None:
+            fn = _apply(OPERATORS[op], fn, self._and())
+        return fn
+
+    def _and(self):
+        fn = self._not()
+        while (op := self._take("&", "-")) is not None:
+            fn = _apply(OPERATORS[op], fn, self._not())
+        return fn
+
+    def _not(self):
+        if self._take("~", "!") is not None:
+            # every bitmap is a subset of all, so all ^ x is its complement
+            inner, every = self._not(), self._chunks("all")
+            return lambda k: every[k] ^ inner(k)
+        if self._take("(") is not None:
+            fn = self._or()
+            if self._take(")") is None:
+                raise ValueError("missing ) in query")
+            return fn
+        if not self.tokens or not isinstance(self.tokens[0], tuple):
+            raise ValueError(f"expected a site name, got {self.tokens[0] if self.tokens else 'end of query'!r}")
+        chunks = self._chunks(self.tokens.pop(0)[1])
+        return chunks.__getitem__
+
+    def _chunks(self, name):
+        key = self.names.get(name.lower())
+        if key is None:
+            raise ValueError(f"unknown site {name!r} (choose from {', '.join(self.chunks)})")
+        return self.chunks[key]
+
+
+class SiteBitmaps:
+    # The per-site bitmaps of one result stream, appended to as results come
+    # in (the Outputs sink) and queried with boolean expressions.
+    def __init__(self, path=BITMAPS_PATH):
+        self.path = path
+        self.count = 0
+        self.bitmaps = {name: Bitmap() for name, _ in FLAGS}
+        self.bitmaps["all"] = Bitmap()
+        if os.path.exists(path):
+            self._load()
+        key = self.count >> CHUNK_BITS
+        self._builders = {name: BitmapBuilder(bitmap, key) for name, bitmap in self.bitmaps.items()}
+
+    def add(self, result):
+        email_id = self.count
+        self.count += 1
+        flags = flags_of(result)
+        builders = self._builders
+        builders["all"].add(email_id)
+        for name, bit in FLAGS:
+            if flags & bit:
+                builders[name].add(email_id)
+
+    def flush(self):
+        for builder in self._builders.values():
+            builder.flush()
+
+    def query(self, expression):
+        # -> Bitmap of the email IDs matching the expression.
+        self.flush()
+        n = len(self.bitmaps["all"].chunks)
+        chunks = {name: bitmap.chunks + [0] * (n - len(bitmap.chunks)) for name, bitmap in self.bitmaps.items()}
+        fn = _Parser(expression, chunks).parse()
+        return Bitmap([fn(k) for k in range(n)])
+
+    def save(self, path=None):
+        self.flush()
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(self.bitmaps), self.count))
+            for name, bitmap in self.bitmaps.items():
+                encoded = name.encode()
+                f.write(struct.pack("<H", len(encoded)) + encoded)
+                containers = [(key, chunk) for key, chunk in enumerate(bitmap.chunks) if chunk]
+                f.write(struct.pack("<I", len(containers)))
+                for key, chunk in containers:
+                    kind, count, payload = _encode(chunk)
+                    f.write(_CONTAINER.pack(key, kind, count))
+                    f.write(payload)
+        os.replace(path + ".tmp", path)
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        magic, bitmaps, self.count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a bitmap file")
+        pos = _HEADER.size
+        for _ in range(bitmaps):
+            (length,) = struct.unpack_from("<H", data, pos)
+            name = data[pos + 2:pos + 2 + length].decode()
+            (containers,) = struct.unpack_from("<I", data, pos + 2 + length)
+            pos += 6 + length
+            chunks = []
+            for _ in range(containers):
+                key, kind, count = _CONTAINER.unpack_from(data, pos)
+                pos += _CONTAINER.size
+                size = CHUNK // 8 if kind == BITMAP else 2 * count * (2 if kind == RUNS else 1)
+                chunks.extend([0] * (key - len(chunks)))
+                chunks.append(_decode(kind, count, data[pos:pos + size]))
+                pos += size
+            self.bitmaps[name] = Bitmap(chunks)
+
+    def close(self):
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build(results_path=RESULTS_PATH, path=None):
+    # Rebuilds the bitmaps of an existing result file.
+    from storage.jsonl import read_results
+
+    path = path or bitmaps_path(results_path)
+    if os.path.exists(path):
+        os.remove(path)
+    with SiteBitmaps(path) as bitmaps:
+        for result in read_results(results_path):
+            bitmaps.add(result)
+    return bitmaps
+
+
+def open_bitmaps(results_path=RESULTS_PATH, path=None):
+    # The bitmaps of a result file, ready to append to. Email IDs are row
+    # numbers, so bitmaps that do not cover exactly the rows already there
+    # (first --bitmaps run on an existing file, a run without --bitmaps in
+    # between, a crash before they were saved) are rebuilt from the file.
+    from storage.jsonl import count_results
+
+    path = path or bitmaps_path(results_path)
+    bitmaps = SiteBitmaps(path)
+    if bitmaps.count != count_results(results_path):
+        bitmaps = build(results_path, path)
+    return bitmaps
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(prog="python -m storage.bitmaps",
+                                     description="Count emails by site with boolean queries over the bitmaps")
+    parser.add_argument("query", nargs="?", help='e.g. "GitHub & Reddit & ~Twitter"')
+    parser.add_argument("--bitmaps", default=BITMAPS_PATH, help="bitmap file")
+    parser.add_argument("--build", metavar="RESULTS", help="(re)build the bitmaps of a result file first")
+    parser.add_argument("--emails", type=int, default=0, metavar="N",
+                        help="also print the first N matching emails (read from --results)")
+    parser.add_argument("--results", default=RESULTS_PATH, help="result file the bitmaps were built from")
+    args = parser.parse_args()
+
+    if args.build:
+        bitmaps = build(args.build, args.bitmaps if args.bitmaps != BITMAPS_PATH else None)
+        print(f"{bitmaps.count} email(s) indexed in {bitmaps.path}")
+    if args.query:
+        bitmaps = SiteBitmaps(args.bitmaps)
+        start = time.perf_counter()
+        matched = bitmaps.query(args.query)
+        found = len(matched)
+        print(f"{found} of {bitmaps.count} email(s) ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        if args.emails and found:
+            from itertools import islice
+
+            from storage.jsonl import count_results, read_results
+
+            rows = count_results(args.results)
+            if rows != bitmaps.count:
+                parser.error(f"{args.results} has {rows} row(s) but the bitmaps cover {bitmaps.count}; "
+                             f"rebuild them with --build {args.results}")
+
+            wanted = set(islice(matched, args.emails))
+            for email_id, result in enumerate(read_results(args.results)):
+                if email_id in wanted:
+                    print(result["email"])
+                    wanted.discard(email_id)
+                    if not wanted:
+                        break
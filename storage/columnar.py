@@ -0,0 +1,256 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from core.classify import CATEGORIES
+from storage.jsonl import RESULTS_PATH
+from storage.records import GRAVATAR_FLAG, MX_FLAG, SITE_NAMES, flags_of
+
+# Results by column, for analysis tools that want whole columns rather than
+# records. The file is a schema header, then chunks of up to CHUNK_ROWS rows
+# with every column stored contiguously (8-byte aligned), then a JSON footer
+# with the chunk directory and the domain dictionary, then a fixed trailer:
+#
+#   "OSCL" u32 schema length, schema JSON  (columns and their array typecodes,
+#                                           site names by flag bit, domain types)
+#   chunk: flags u64, domain_id u32, domain_type u8, username_end u32, username bytes
+#   ...
+#   footer JSON {"rows", "chunks": [{"rows", "columns": {name: [offset, size]}}], "domains"}
+#   u64 footer offset, u64 footer size, "OSCL"
+#
+# A reader memory-maps the file and casts column ranges to memoryviews, so
+# nothing is parsed or copied but the footer. The writer appends: it reads
+# the footer back, writes new chunks after the old trailer and a new footer
+# and trailer on close, so the file stays readable up to the last finished
+# run. When a run was cut short the end of the file is no trailer; readers
+# then use the last complete one, and the next writer cuts the rest off.
+
+CHUNK_ROWS = 1 << 16
+VERSION = 1
+
+MAGIC = b"OSCL"
+_HEADER = struct.Struct("<4sI")
+_TRAILER = struct.Struct("<QQ4s")
+
+COLUMNS = (("flags", "Q"), ("domain_id", "I"), ("domain_type", "B"), ("username_end", "I"), ("username", "B"))
+DOMAIN_TYPES = (None,) + CATEGORIES + ("corporate",)
+SCHEMA = {
+    "version": VERSION,
+    "columns": [list(column) for column in COLUMNS],
+    "sites": list(SITE_NAMES),
+    "flags": {"mx": MX_FLAG.bit_length() - 1, "gravatar": GRAVATAR_FLAG.bit_length() - 1},
+    "domain_types": list(DOMAIN_TYPES),
+}
+_TYPE_CODES = {name: code for code, name in enumerate(DOMAIN_TYPES)}
+
+
+def columnar_path(results_path):
+    # output/results.json(.gz) -> output/results.col
+    base = results_path[:-3] if results_path.endswith(".gz") else results_path
+    return os.path.splitext(base)[0] + ".col"
+
+
+COLUMNAR_PATH = columnar_path(RESULTS_PATH)
+
+
+class ColumnarWriter:
+    def __init__(self, path=COLUMNAR_PATH, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.chunks = []
+        self.domains = []
+        self._domain_ids = {}
+        self._new_chunk()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) and not _unfinished(path):
+            self._file = open(path, "r+b")
+            with ColumnarReader(path) as reader:
+                if reader.schema["columns"] != SCHEMA["columns"] or reader.schema["sites"] != SCHEMA["sites"]:
+                    raise ValueError(f"{path} was written with another schema")
+                self.rows, self.chunks, end = reader.rows, reader.chunks, reader.end
+                self.domains = list(reader.domains)
+            self._domain_ids = {domain: i for i, domain in enumerate(self.domains)}
+            self._file.seek(end)
+            self._file.truncate()
+        else:
+            self._file = open(path, "wb")
+            schema = json.dumps(SCHEMA).encode()
+            self._file.write(_HEADER.pack(MAGIC, len(schema)) + schema)
+
+    def _new_chunk(self):
+        self._flags = array("Q")
+        self._domain_column = array("I")
+        self._types = array("B")
+        self._username_ends = array("I")
+        self._usernames = bytearray()
+
+    def write(self, result):
+        domain = result["domain"]
+        domain_id = self._domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = self._domain_ids[domain] = len(self.domains)
+            self.domains.append(domain)
+        self._flags.append(flags_of(result))
+        self._domain_column.append(domain_id)
+        self._types.append(_TYPE_CODES.get(result["domain_type"], 0))
+        self._usernames += result["username"].encode()
+        self._username_ends.append(len(self._usernames))
+        if len(self._flags) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        rows = len(self._flags)
+        if not rows:
+            return
+        f = self._file
+        columns = {}
+        for (name, _), data in zip(COLUMNS, (self._flags, self._domain_column, self._types, self._username_ends,
+                                             self._usernames)):
+            f.write(b"\0" * (-f.tell() % 8))
+            columns[name] = [f.tell(), len(data) * (data.itemsize if isinstance(data, array) else 1)]
+            f.write(data)
+        self.chunks.append({"rows": rows, "columns": columns})
+        self.rows += rows
+        self._new_chunk()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        f = self._file
+        footer = json.dumps({"rows": self.rows, "chunks": self.chunks, "domains": self.domains}).encode()
+        offset = f.tell()
+        f.write(footer)
+        f.write(_TRAILER.pack(offset, len(footer), MAGIC))
+        f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _last_footer(mm):
+    # (footer, end of its trailer) of the last complete footer. Normally the
+    # trailer ends the file; after an interrupted append, earlier trailers
+    # are found by their magic and checked against the footer they point to.
+    end = len(mm)
+    while end >= _HEADER.size + _TRAILER.size:
+        offset, size, magic = _TRAILER.unpack_from(mm, end - _TRAILER.size)
+        if magic == MAGIC and offset >= _HEADER.size and offset + size == end - _TRAILER.size:
+            try:
+                return json.loads(mm[offset:offset + size]), end
+            except ValueError:
+                pass
+        found = mm.rfind(MAGIC, _HEADER.size, end - 1)
+        if found < 0:
+            return None
+        end = found + len(MAGIC)
+    return None
+
+
+def _unfinished(path):
+    # A columnar file whose first run never wrote a footer: none of it can be
+    # read, so it is started again.
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _last_footer(mm) is None
+
+
+class ColumnarReader:
+    def __init__(self, path=COLUMNAR_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        magic, schema_size = _HEADER.unpack_from(mm) if len(mm) >= _HEADER.size else (None, 0)
+        found = _last_footer(mm) if magic == MAGIC else None
+        if found is None:
+            raise ValueError(f"{path} is not a columnar result file")
+        footer, self.end = found
+        self.schema = json.loads(mm[_HEADER.size:_HEADER.size + schema_size])
+        if self.schema["version"] != VERSION:
+            raise ValueError(f"{path}: unsupported version {self.schema['version']}")
+        self.rows = footer["rows"]
+        self.chunks = footer["chunks"]
+        self.domains = footer["domains"]
+        self.types = dict(self.schema["columns"])
+        self._views = []
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name, chunk):
+        # Zero-copy view of one column of one chunk, typed by the schema.
+        offset, size = self.chunks[chunk]["columns"][name]
+        view = memoryview(self._mm)[offset:offset + size].cast(self.types[name])
+        self._views.append(view)
+        return view
+
+    def columns(self, name):
+        # One view per chunk.
+        return [self.column(name, i) for i in range(len(self.chunks))]
+
+    def site_bit(self, site):
+        return 1 << self.schema["sites"].index(site)
+
+    def chunk_rows(self, chunk):
+        # (username, domain, flags, domain type) for each row of a chunk.
+        flags = self.column("flags", chunk)
+        domain_ids = self.column("domain_id", chunk)
+        types = self.column("domain_type", chunk)
+        ends = self.column("username_end", chunk)
+        names = self.column("username", chunk)
+        domain_types = self.schema["domain_types"]
+        start = 0
+        for i in range(len(flags)):
+            yield (bytes(names[start:ends[i]]).decode(), self.domains[domain_ids[i]], flags[i],
+                   domain_types[types[i]])
+            start = ends[i]
+
+    def __iter__(self):
+        for chunk in range(len(self.chunks)):
+            yield from self.chunk_rows(chunk)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export(results_path=RESULTS_PATH, path=None):
+    # Writes the columnar file of an existing result file.
+    from storage.jsonl import read_results
+
+    path = path or columnar_path(results_path)
+    if os.path.exists(path):
+        os.remove(path)
+    with ColumnarWriter(path) as writer:
+        for result in read_results(results_path):
+            writer.write(result)
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = export(*sys.argv[1:3])
+    with ColumnarReader(path) as reader:
+        print(f"{reader.rows} row(s) in {len(reader.chunks)} chunk(s), {len(reader.domains)} domain(s): {path}")
+        for site in reader.schema["sites"]:
+            bit = reader.site_bit(site)
+            print(f"  {site}: {sum(1 for view in reader.columns('flags') for flags in view if flags & bit)}")
@@ -0,0 +1,164 @@
+import os
+
+from storage.jsonl import ROOT
+
+DB_PATH = os.path.join(ROOT, "output", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emails (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    mx INTEGER,
+    gravatar TEXT
+);
+CREATE TABLE IF NOT EXISTS sites (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS hits (
+    site_id INTEGER NOT NULL REFERENCES sites(id),
+    email_id INTEGER NOT NULL REFERENCES emails(id),
+    url TEXT NOT NULL,
+    PRIMARY KEY (site_id, email_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_emails_username ON emails(username);
+CREATE INDEX IF NOT EXISTS idx_emails_domain ON emails(domain);
+CREATE INDEX IF NOT EXISTS idx_hits_email ON hits(email_id);
+"""
+
+UPSERT_EMAIL = """
+INSERT INTO emails (email, username, domain, mx, gravatar) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(email) DO UPDATE SET
+    username = excluded.username, domain = excluded.domain,
+    mx = excluded.mx, gravatar = excluded.gravatar
+RETURNING id
+"""
+
+
+def _mx(mx):
+    # NULL when the dns stage did not run, 0 for a domain without MX.
+    return None if mx is None else int(mx)
+
+
+class ResultStore:
+    def __init__(self, path=DB_PATH, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._site_ids = {}
+
+        import sqlite3
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.db.executescript(SCHEMA)
+        self._site_ids.update((name, id) for id, name in self.db.execute("SELECT id, name FROM sites"))
+
+    def _migrate(self):
+        # mx used to be NOT NULL, which stored "not checked" as 0 ("no MX").
+        # SQLite cannot drop a constraint, so the table is copied into a new
+        # one (ids kept, so hits still point at the right rows).
+        columns = {row[1]: row[3] for row in self.db.execute("PRAGMA table_info(emails)")}
+        if not columns.get("mx"):
+            return
+        self.db.executescript("""
+            BEGIN;
+            CREATE TABLE emails_new (
+                id INTEGER PRIMARY KEY,
+                email TEXT NOT NULL UNIQUE,
+                username TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                mx INTEGER,
+                gravatar TEXT
+            );
+            INSERT INTO emails_new SELECT id, email, username, domain, mx, gravatar FROM emails;
+            DROP TABLE emails;
+            ALTER TABLE emails_new RENAME TO emails;
+            COMMIT;
+        """)
+
+    def site_id(self, name):
+        if name not in self._site_ids:
+            self.db.execute("INSERT OR IGNORE INTO sites (name) VALUES (?)", (name,))
+            self._site_ids[name] = self.db.execute("SELECT id FROM sites WHERE name = ?", (name,)).fetchone()[0]
+        return self._site_ids[name]
+
+    def write(self, result):
+        self._pending.append(result)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        # One transaction per batch: a single fsync instead of one per email.
+        self.db.execute("BEGIN")
+        try:
+            for r in self._pending:
+                email_id = self.db.execute(
+                    UPSERT_EMAIL, (r["email"], r["username"], r["domain"], _mx(r["mx"]), r["gravatar"])
+                ).fetchone()[0]
+                self.db.execute("DELETE FROM hits WHERE email_id = ?", (email_id,))
+                self.db.executemany(
+                    "INSERT INTO hits (site_id, email_id, url) VALUES (?, ?, ?)",
+                    [(self.site_id(site), email_id, url) for site, url in r["accounts"].items()],
+                )
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            self._site_ids.clear()
+            self._site_ids.update((name, id) for id, name in self.db.execute("SELECT id, name FROM sites"))
+            raise
+        self._pending.clear()
+
+    def emails_on(self, *sites):
+        # Emails found on every given site, intersected through the (site_id, email_id) key.
+        ids = [self._site_ids.get(site) for site in sites]
+        if not ids or None in ids:
+            return []
+        subquery = " INTERSECT ".join(["SELECT email_id FROM hits WHERE site_id = ?"] * len(ids))
+        rows = self.db.execute(f"SELECT email FROM emails WHERE id IN ({subquery}) ORDER BY id", ids)
+        return [row[0] for row in rows]
+
+    def emails_by_username(self, username):
+        return [row[0] for row in self.db.execute("SELECT email FROM emails WHERE username = ?", (username,))]
+
+    def emails_by_domain(self, domain):
+        return [row[0] for row in self.db.execute("SELECT email FROM emails WHERE domain = ?", (domain,))]
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the SQLite result store")
+    parser.add_argument("--db", default=DB_PATH)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--sites", nargs="+", help="emails found on all of these sites")
+    group.add_argument("--username")
+    group.add_argument("--domain")
+    args = parser.parse_args()
+
+    with ResultStore(args.db) as store:
+        if args.sites:
+            emails = store.emails_on(*args.sites)
+        elif args.username:
+            emails = store.emails_by_username(args.username)
+        else:
+            emails = store.emails_by_domain(args.domain)
+    for email in emails:
+        print(email)
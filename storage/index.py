@@ -0,0 +1,150 @@
+import heapq
+import mmap
+import os
+import struct
+from array import array
+from itertools import groupby
+
+from storage.jsonl import ROOT
+
+INDEX_DIR = os.path.join(ROOT, "output", "index")
+KINDS = ("username", "domain", "profile")
+
+# A segment is an immutable sorted run of entries ``key\0email\0email...``,
+# followed by the entry offsets and a fixed footer. Lookups binary search the
+# memory-mapped offsets, so nothing is parsed when a segment is opened.
+MAGIC = b"OSIX"
+_FOOTER = struct.Struct("<QQ4s")
+
+
+class _Segment:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count, offsets_pos, magic = _FOOTER.unpack_from(self._mm, len(self._mm) - _FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an index segment")
+        self.count = count
+        self._offsets = memoryview(self._mm)[offsets_pos:offsets_pos + 8 * (count + 1)].cast("Q")
+
+    def _key(self, i):
+        start = self._offsets[i]
+        end = self._mm.find(b"\0", start, self._offsets[i + 1])
+        return self._mm[start:end if end != -1 else self._offsets[i + 1]]
+
+    def get(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == key:
+            return self._mm[self._offsets[lo]:self._offsets[lo + 1]].split(b"\0")[1:]
+        return []
+
+    def __iter__(self):
+        for i in range(self.count):
+            key, *emails = self._mm[self._offsets[i]:self._offsets[i + 1]].split(b"\0")
+            yield key, emails
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+
+def _write_segment(path, entries):
+    offsets = array("Q")
+    pos = 0
+    with open(path + ".tmp", "wb") as f:
+        for key, emails in entries:
+            offsets.append(pos)
+            data = b"\0".join([key, *emails])
+            f.write(data)
+            pos += len(data)
+        offsets.append(pos)
+        offsets.tofile(f)
+        f.write(_FOOTER.pack(len(offsets) - 1, pos, MAGIC))
+    os.replace(path + ".tmp", path)
+
+
+def _merge(runs):
+    for key, group in groupby(heapq.merge(*runs, key=lambda entry: entry[0]), key=lambda entry: entry[0]):
+        yield key, sorted({email for _, emails in group for email in emails})
+
+
+def _index_key(kind, value):
+    return f"{kind}:{value}".replace("\0", "").encode()
+
+
+class InvertedIndex:
+    def __init__(self, path=INDEX_DIR, buffer_size=100_000, max_segments=8):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.max_segments = max_segments
+        self._buffer = {}
+        self._buffered = 0
+        os.makedirs(path, exist_ok=True)
+        self._segments = [_Segment(os.path.join(path, name)) for name in sorted(os.listdir(path))
+                          if name.endswith(".seg")]
+
+    def add(self, result):
+        email = result["email"].replace("\0", "").encode()
+        keys = [_index_key("username", result["username"].lower()), _index_key("domain", result["domain"].lower())]
+        keys += [_index_key("profile", url) for url in result["accounts"].values()]
+        for key in keys:
+            self._buffer.setdefault(key, set()).add(email)
+        self._buffered += len(keys)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def lookup(self, kind, value):
+        if kind in ("username", "domain"):
+            value = value.lower()
+        key = _index_key(kind, value)
+        emails = set(self._buffer.get(key, ()))
+        for segment in self._segments:
+            emails.update(segment.get(key))
+        return sorted(email.decode() for email in emails)
+
+    def _next_path(self):
+        last = int(os.path.basename(self._segments[-1].path)[:-4]) if self._segments else 0
+        return os.path.join(self.path, f"{last + 1:08d}.seg")
+
+    def flush(self):
+        if not self._buffer:
+            return
+        path = self._next_path()
+        _write_segment(path, ((key, sorted(self._buffer[key])) for key in sorted(self._buffer)))
+        self._segments.append(_Segment(path))
+        self._buffer.clear()
+        self._buffered = 0
+        if len(self._segments) > self.max_segments:
+            self.compact()
+
+    def compact(self):
+        if len(self._segments) < 2:
+            return
+        old = self._segments
+        path = self._next_path()
+        _write_segment(path, _merge(old))
+        self._segments = [_Segment(path)]
+        # A crash before this point only leaves duplicate postings behind,
+        # which lookups and the next compaction merge away.
+        for segment in old:
+            segment.close()
+            os.remove(segment.path)
+
+    def close(self):
+        self.flush()
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
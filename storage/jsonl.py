@@ -0,0 +1,146 @@
+import gzip
+import json
+import os
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "output", "results.json")
+GZIP_MAGIC = b"\x1f\x8b"
+
+_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+class ResultWriter:
+    def __init__(self, path=RESULTS_PATH, batch_size=1000, flush_interval=5.0, compress=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.count = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _check_format(path, compress)
+        self._file = open(path, "ab")
+        _repair_tail(self._file, compress)
+
+    def write(self, record):
+        self._buffer.append(_encode(record))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = ("\n".join(self._buffer) + "\n").encode()
+        if self.compress:
+            # Each batch is a complete gzip member, so the file stays readable
+            # (and appendable) up to the last finished batch.
+            data = gzip.compress(data, compresslevel=6)
+        self._file.write(data)
+        self._file.flush()
+        self.count += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_format(path, compress):
+    # Appending gzip members to a plain file (or lines to a gzip one) would
+    # leave a file neither reader can read, and the tail repair would cut it.
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        head = f.read(2)
+    if head and (head == GZIP_MAGIC) != compress:
+        found, asked = ("gzip", "plain") if head == GZIP_MAGIC else ("plain", "gzip")
+        raise ValueError(f"{path} is {found}; cannot append {asked} results to it")
+
+
+def _repair_tail(f, compress):
+    # Cut off whatever an interrupted run left half written.
+    size = f.seek(0, os.SEEK_END)
+    if not size:
+        return
+    with open(f.name, "rb") as r:
+        end = _gzip_valid_length(r) if compress else _last_newline(r, size)
+    if end < size:
+        f.truncate(end)
+        f.seek(end)
+
+
+def _last_newline(f, size):
+    pos = size
+    while pos > 0:
+        step = min(1 << 16, pos)
+        f.seek(pos - step)
+        i = f.read(step).rfind(b"\n")
+        if i != -1:
+            return pos - step + i + 1
+        pos -= step
+    return 0
+
+
+def _gzip_valid_length(f):
+    offset = good = 0
+    d = zlib.decompressobj(31)
+    while True:
+        chunk = f.read(1 << 16)
+        if not chunk:
+            return good
+        while chunk:
+            try:
+                d.decompress(chunk)
+            except zlib.error:
+                return good
+            if d.eof:
+                offset += len(chunk) - len(d.unused_data)
+                good = offset
+                chunk = d.unused_data
+                d = zlib.decompressobj(31)
+            else:
+                offset += len(chunk)
+                chunk = b""
+
+
+def count_results(path=RESULTS_PATH):
+    # Complete rows of a result file, counted without decoding them.
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        gz = f.read(2) == GZIP_MAGIC
+    rows = 0
+    with (gzip.open if gz else open)(path, "rb") as f:
+        try:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                rows += block.count(b"\n")
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            pass
+    return rows
+
+
+def read_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        gz = f.read(2) == GZIP_MAGIC
+    with (gzip.open if gz else open)(path, "rb") as f:
+        try:
+            for line in f:
+                if line.endswith(b"\n"):
+                    yield json.loads(line)
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            return
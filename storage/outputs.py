@@ -0,0 +1,69 @@
+from core.report import ReportWriter, REPORT_PATH
+from storage.database import ResultStore
+from storage.index import InvertedIndex
+from storage.jsonl import ResultWriter, RESULTS_PATH
+
+
+class Outputs:
+    # Every place a finished result goes: the JSONL file and the report
+    # always, the SQLite store and the inverted index when given a path, and
+    # the per-site bitmaps and the columnar file (next to the JSONL file) when
+    # asked for. With validate, that share of the results (1 for all) is
+    # checked against the result schema first (storage.schema).
+
+    def __init__(self, output=RESULTS_PATH, compress=False, report=REPORT_PATH, db=None, index=None, bitmaps=False,
+                 columnar=False, validate=None):
+        self.validator = None
+        if validate:
+            from storage.schema import ResultValidator
+
+            self.validator = ResultValidator(validate)
+        self.writer = ResultWriter(output, compress=compress)
+        self.reporter = ReportWriter(report)
+        self.store = ResultStore(db) if db else None
+        self.index = InvertedIndex(index) if index else None
+        self.bitmaps = self.columnar = None
+        if bitmaps:
+            from storage.bitmaps import open_bitmaps
+
+            self.bitmaps = open_bitmaps(output)
+        if columnar:
+            from storage.columnar import ColumnarWriter, columnar_path
+
+            self.columnar = ColumnarWriter(columnar_path(output))
+
+    def write(self, result):
+        if self.validator:
+            self.validator.check(result)
+        self.writer.write(result)
+        self.reporter.add(result)
+        if self.store:
+            self.store.write(result)
+        if self.index:
+            self.index.add(result)
+        if self.bitmaps:
+            self.bitmaps.add(result)
+        if self.columnar:
+            self.columnar.write(result)
+
+    def flush(self):
+        self.writer.flush()
+        self.reporter.flush()
+        if self.store:
+            self.store.flush()
+        # The index is left to flush on its own buffer size: each flush
+        # writes a segment, and it can always be rebuilt from the results.
+        # The bitmaps are saved whole, and the columnar file writes whole
+        # chunks and its footer on close.
+
+    def close(self):
+        for sink in (self.writer, self.reporter, self.store, self.index, self.bitmaps, self.columnar,
+                     self.validator):
+            if sink:
+                sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,148 @@
+from array import array
+
+from core.gravatar import avatar_url
+from modules.dev_plateforms import DEVS
+from modules.forums import FORUMS
+from modules.social_accounts import SOCIAL_SITES
+from storage.jsonl import RESULTS_PATH, read_results
+
+# Compact, in-memory form of the site-probe results for holding millions of
+# emails at once (aggregates, indexes, exports). A result's accounts become
+# one integer of found flags, bit i for site i, and profile and Gravatar URLs
+# are rebuilt from the username when asked for. Site IDs are positions in
+# SITE_NAMES: new sites must be added at the end so IDs stay stable.
+
+SITES = {**SOCIAL_SITES, **FORUMS, **DEVS}
+SITE_NAMES = tuple(SITES)
+SITE_IDS = {name: i for i, name in enumerate(SITE_NAMES)}
+TEMPLATES = tuple(SITES.values())
+
+MX_FLAG = 1 << 63
+GRAVATAR_FLAG = 1 << 62
+if len(SITE_NAMES) > 62:
+    raise ValueError("more sites than flag bits")
+
+
+def flags_of(result):
+    flags = MX_FLAG if result["mx"] else 0
+    if result["gravatar"]:
+        flags |= GRAVATAR_FLAG
+    for site in result["accounts"]:
+        site_id = SITE_IDS.get(site)
+        if site_id is not None:
+            flags |= 1 << site_id
+    return flags
+
+
+class Record:
+    __slots__ = ("username", "domain", "flags")
+
+    def __init__(self, username, domain, flags=0):
+        self.username = username
+        self.domain = domain
+        self.flags = flags
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(result["username"], result["domain"], flags_of(result))
+
+    @property
+    def email(self):
+        return f"{self.username}@{self.domain}"
+
+    @property
+    def mx(self):
+        return bool(self.flags & MX_FLAG)
+
+    @property
+    def gravatar(self):
+        return avatar_url(self.email) if self.flags & GRAVATAR_FLAG else None
+
+    def found(self, site):
+        return bool(self.flags >> SITE_IDS[site] & 1)
+
+    @property
+    def sites(self):
+        return [name for i, name in enumerate(SITE_NAMES) if self.flags >> i & 1]
+
+    @property
+    def accounts(self):
+        return {name: TEMPLATES[i].format(self.username) for i, name in enumerate(SITE_NAMES) if self.flags >> i & 1}
+
+    def __repr__(self):
+        return f"Record({self.email!r}, sites={self.sites})"
+
+
+class RecordTable:
+    # Records stored by column: usernames as one UTF-8 buffer with offsets,
+    # domains as IDs into a table of distinct domains, flags as 64-bit
+    # integers. About 20 bytes plus the username per email.
+
+    def __init__(self):
+        self._names = bytearray()
+        self._offsets = array("Q", [0])
+        self._domain_ids = array("I")
+        self._flags = array("Q")
+        self.domains = []
+        self._domain_index = {}
+
+    def append(self, username, domain, flags=0):
+        domain_id = self._domain_index.get(domain)
+        if domain_id is None:
+            domain_id = self._domain_index[domain] = len(self.domains)
+            self.domains.append(domain)
+        self._names += username.encode()
+        self._offsets.append(len(self._names))
+        self._domain_ids.append(domain_id)
+        self._flags.append(flags)
+
+    def add(self, result):
+        self.append(result["username"], result["domain"], flags_of(result))
+
+    def __len__(self):
+        return len(self._flags)
+
+    def username(self, i):
+        return self._names[self._offsets[i]:self._offsets[i + 1]].decode()
+
+    def domain(self, i):
+        return self.domains[self._domain_ids[i]]
+
+    def flags(self, i):
+        return self._flags[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Record(self.username(i), self.domain(i), self._flags[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def count(self, site):
+        bit = 1 << SITE_IDS[site]
+        return sum(1 for flags in self._flags if flags & bit)
+
+    def nbytes(self):
+        # Memory held by the columns (domain strings excluded).
+        return (len(self._names) + self._offsets.itemsize * len(self._offsets)
+                + self._domain_ids.itemsize * len(self._domain_ids) + self._flags.itemsize * len(self._flags))
+
+
+def read_records(path=RESULTS_PATH):
+    table = RecordTable()
+    for result in read_results(path):
+        table.add(result)
+    return table
+
+
+if __name__ == "__main__":
+    import sys
+
+    records = read_records(sys.argv[1] if len(sys.argv) > 1 else RESULTS_PATH)
+    print(f"{len(records)} record(s), {records.nbytes() / 1024:.1f} KiB, {len(records.domains)} domain(s)")
+    for site in SITE_NAMES:
+        print(f"  {site}: {records.count(site)}")
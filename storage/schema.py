@@ -0,0 +1,152 @@
+import json
+import os
+import random
+import threading
+import time
+
+from core import metrics
+from storage.jsonl import ROOT
+
+VIOLATIONS_PATH = os.path.join(ROOT, "output", "violations.jsonl")
+
+# The shape of a pipeline result record, as written to the outputs. Stages
+# that did not run leave their fields empty (null, {}), "smtp" is only there
+# with --smtp. Every key is required and no others are allowed, so a result
+# that grows, loses or renames a field fails here before consumers see it.
+
+_STRING_MAP = {"type": "object", "additionalProperties": {"type": "string"}}
+_MX_HOST = {
+    "type": "object",
+    "required": ["host", "priority", "addresses"],
+    "additionalProperties": False,
+    "properties": {
+        "host": {"type": "string"},
+        "priority": {"type": "integer"},
+        "addresses": {"type": "array", "items": {"type": "string"}},
+    },
+}
+_DNS = {
+    "type": ["object", "null"],
+    "required": ["has_mx", "null_mx", "mx", "spf", "dmarc"],
+    "additionalProperties": False,
+    "properties": {
+        "has_mx": {"type": "boolean"},
+        "null_mx": {"type": "boolean"},
+        "mx": {"type": "array", "items": _MX_HOST},
+        "spf": {"type": ["string", "null"]},
+        "dmarc": {"type": ["string", "null"]},
+    },
+}
+_PROFILE = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "display_name": {"type": "string"},
+        "bio": {"type": "string"},
+        "followers": {"type": ["integer", "null"]},
+        "links": {"type": "array", "items": {"type": "string"}},
+        "image": {"type": "string"},
+    },
+}
+
+RESULT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "Python-Osint result",
+    "type": "object",
+    "required": ["email", "username", "domain", "domain_type", "mx", "dns", "gravatar", "accounts", "profiles",
+                 "dorks", "search"],
+    "additionalProperties": False,
+    "properties": {
+        "email": {"type": "string", "pattern": "@"},
+        "username": {"type": "string", "minLength": 1},
+        "domain": {"type": "string", "minLength": 1},
+        "domain_type": {"enum": [None, "disposable", "free", "corporate"]},
+        "mx": {"type": ["boolean", "null"]},
+        "dns": _DNS,
+        "gravatar": {"type": ["string", "null"]},
+        "accounts": _STRING_MAP,
+        "profiles": {"type": "object", "additionalProperties": _PROFILE},
+        "dorks": _STRING_MAP,
+        "search": {"type": "object", "additionalProperties": {"type": "array", "items": {"type": "string"}}},
+        "smtp": {"enum": [None, "valid", "invalid", "catch_all", "unknown"]},
+    },
+}
+
+# The "dns" object of a result is the cached one of its domain, shared by
+# every email there, so it is checked on its own, once per object, and the
+# record schema only checks its type. That is half the cost of a record.
+_RECORD_SCHEMA = dict(RESULT_SCHEMA, properties=dict(RESULT_SCHEMA["properties"], dns={"type": ["object", "null"]}))
+SEEN_SIZE = 10_000
+
+_validators = None
+_lock = threading.Lock()
+
+
+def get_validator():
+    # (record, dns) validators, compiled to Python code once per process on
+    # first use.
+    global _validators
+    with _lock:
+        if _validators is None:
+            import fastjsonschema
+
+            _validators = fastjsonschema.compile(_RECORD_SCHEMA), fastjsonschema.compile(_DNS)
+    return _validators
+
+
+class ResultValidator:
+    # Checks a sample of the results (all of them by default) against the
+    # compiled schema on their way to the outputs. A result that does not
+    # match is still written; the violation goes to its own JSONL file (the
+    # record, the failing rule and where) and is counted.
+
+    def __init__(self, sample=1.0, path=VIOLATIONS_PATH):
+        self.sample = sample
+        self.path = path
+        self.checked = 0
+        self.violations = 0
+        self._validate, self._validate_dns = get_validator()
+        self._error = __import__("fastjsonschema").JsonSchemaValueException
+        self._file = None
+        # id -> dns object already checked; holding the object keeps its id
+        # from being reused by another one.
+        self._seen = {}
+
+    def check(self, result):
+        if self.sample < 1.0 and random.random() >= self.sample:
+            return True
+        self.checked += 1
+        try:
+            self._validate(result)
+            dns = result["dns"]
+            if dns is not None and id(dns) not in self._seen:
+                self._validate_dns(dns, name_prefix="data.dns")
+                if len(self._seen) >= SEEN_SIZE:
+                    self._seen.clear()
+                self._seen[id(dns)] = dns
+        except self._error as exc:
+            self.violations += 1
+            metrics.inc("osint_schema_violations_total", rule=exc.rule or "")
+            self._report(result, exc)
+            return False
+        return True
+
+    def _report(self, result, exc):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "error": exc.message, "path": exc.name,
+                 "rule": exc.rule, "record": result}
+        self._file.write(json.dumps(entry, default=repr) + "\n")
+        self._file.flush()
+
+    def close(self):
+        metrics.inc("osint_schema_checks_total", self.checked)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+if __name__ == "__main__":
+    # The schema, for consumers of the result files.
+    print(json.dumps(RESULT_SCHEMA, indent=2))